@@ -0,0 +1,125 @@
+import os
+import pickle
+import zlib
+import hashlib
+from io import BytesIO
+from os.path import join
+from os import walk
+from settings import *
+from debug import debug
+
+
+class SurfacePickler(pickle.Pickler):
+    def __init__(self, file):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.surfaces = []
+        self.surface_ids = {}
+
+    def persistent_id(self, obj):
+        # surfaces are stored once in the pixel blob, shared surfaces stay shared
+        if isinstance(obj, pygame.Surface):
+            if obj.get_parent() is not None:
+                # views into an atlas page only store where they are on it
+                return self.persistent_id(obj.get_abs_parent()), obj.get_abs_offset(), obj.get_size()
+            if id(obj) not in self.surface_ids:
+                self.surface_ids[id(obj)] = len(self.surfaces)
+                self.surfaces.append(obj)
+            return self.surface_ids[id(obj)]
+        return None
+
+
+class SurfaceUnpickler(pickle.Unpickler):
+    def __init__(self, file, surfaces):
+        super().__init__(file)
+        self.surfaces = surfaces
+
+    def persistent_load(self, pid):
+        if isinstance(pid, tuple):
+            page, offset, size = pid
+            return self.surfaces[page].subsurface(offset, size)
+        return self.surfaces[pid]
+
+
+class AssetCache:
+    def __init__(self, filepath='../save_data/cache/'):
+        self.filepath = filepath
+        self.ensure_directory_exists()
+
+    def ensure_directory_exists(self):
+        if not os.path.exists(self.filepath):
+            os.makedirs(self.filepath)
+
+    def get_full_path(self, name):
+        return join(self.filepath, f'{name}.cache')
+
+    @staticmethod
+    def get_fingerprint(*paths):
+        files = []
+        for path in paths:
+            for folder_path, _, file_names in walk(path):
+                for file_name in file_names:
+                    stat = os.stat(join(folder_path, file_name))
+                    files.append((join(folder_path, file_name), stat.st_mtime_ns, stat.st_size))
+        return hashlib.sha1(repr((ASSET_CACHE_VERSION, sorted(files))).encode()).hexdigest()
+
+    def load(self, name, build, *paths):
+        """Return the cached result of build() for the files under paths, rebuilding it if any of them changed."""
+        fingerprint = self.get_fingerprint(*paths)
+        data = self.read(name, fingerprint)
+        if data is None:
+            data = build()
+            self.write(name, fingerprint, data)
+        return data
+
+    def read(self, name, fingerprint):
+        full_path = self.get_full_path(name)
+        if not os.path.exists(full_path):
+            return None
+
+        try:
+            with open(full_path, 'rb') as cache_file:
+                header = pickle.load(cache_file)
+                if header['fingerprint'] != fingerprint:
+                    return None
+                pixels = memoryview(zlib.decompress(cache_file.read()))
+
+            # short or truncated pixel data only shows once the surfaces are built
+            surfaces = []
+            for size, colorkey, start, end in header['surfaces']:
+                if colorkey:
+                    surf = pygame.image.frombuffer(pixels[start:end], size, 'RGB').convert()
+                    surf.set_colorkey(colorkey)
+                else:
+                    surf = pygame.image.frombuffer(pixels[start:end], size, 'RGBA').convert_alpha()
+                surfaces.append(surf)
+            return SurfaceUnpickler(BytesIO(header['data']), surfaces).load()
+        except (IOError, EOFError, KeyError, ValueError, pygame.error, pickle.UnpicklingError, zlib.error) as e:
+            debug(f"Discarding unreadable asset cache {full_path}: {e}")
+            return None
+
+    def write(self, name, fingerprint, data):
+        data_file = BytesIO()
+        pickler = SurfacePickler(data_file)
+        pickler.dump(data)
+
+        surfaces, pixels, start = [], [], 0
+        for surf in pickler.surfaces:
+            colorkey = surf.get_colorkey()
+            surf_bytes = pygame.image.tobytes(surf, 'RGB' if colorkey else 'RGBA')
+            surfaces.append((surf.get_size(), colorkey and tuple(colorkey), start, start + len(surf_bytes)))
+            pixels.append(surf_bytes)
+            start += len(surf_bytes)
+
+        header = {'fingerprint': fingerprint, 'surfaces': surfaces, 'data': data_file.getvalue()}
+        full_path = self.get_full_path(name)
+        try:
+            # write next to the cache and swap it in, so a crash never leaves half a cache behind
+            with open(full_path + '.tmp', 'wb') as cache_file:
+                pickle.dump(header, cache_file, pickle.HIGHEST_PROTOCOL)
+                cache_file.write(zlib.compress(b''.join(pixels), 1))
+            os.replace(full_path + '.tmp', full_path)
+        except IOError as e:
+            debug(f"An error occurred while writing the asset cache: {e}")
+
+
+asset_cache = AssetCache()
@@ -0,0 +1,59 @@
+from settings import *
+
+
+class TextureAtlas:
+    def __init__(self, size=ATLAS_SIZE):
+        self.size = size
+        self.pages = []
+
+    def pack(self, frames):
+        """Copy every surface of a nested dict / list of frames onto atlas pages and return it with subsurface views."""
+        surfaces = {}
+        self.collect(frames, surfaces)
+        views = self.place(list(surfaces.values()))
+        return self.rebuild(frames, views)
+
+    def collect(self, frames, surfaces):
+        if isinstance(frames, dict):
+            for value in frames.values():
+                self.collect(value, surfaces)
+        elif isinstance(frames, (list, tuple)):
+            for value in frames:
+                self.collect(value, surfaces)
+        elif isinstance(frames, pygame.Surface):
+            surfaces[id(frames)] = frames
+
+    def rebuild(self, frames, views):
+        if isinstance(frames, dict):
+            return {key: self.rebuild(value, views) for key, value in frames.items()}
+        if isinstance(frames, (list, tuple)):
+            return type(frames)(self.rebuild(value, views) for value in frames)
+        return views.get(id(frames), frames)
+
+    def place(self, surfaces):
+        # shelf packing, tallest surfaces first so every shelf wastes as little height as possible
+        placements, page_heights = [], []
+        x, y, shelf_height = 0, 0, 0
+        for surf in sorted(surfaces, key=lambda surf: (-surf.get_height(), -surf.get_width())):
+            width, height = surf.get_size()
+            if width > self.size or height > self.size:
+                continue
+            if x + width > self.size:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            if not page_heights or y + height > self.size:
+                page_heights.append(0)
+                x, y, shelf_height = 0, 0, 0
+            placements.append((surf, len(page_heights) - 1, (x, y)))
+            x += width
+            shelf_height = max(shelf_height, height)
+            page_heights[-1] = max(page_heights[-1], y + height)
+
+        # the last page is cut to the height it actually uses
+        pages = [pygame.Surface((self.size, height), pygame.SRCALPHA) for height in page_heights]
+        self.pages.extend(pages)
+        views = {}
+        for surf, page_index, pos in placements:
+            # colorkeyed pixels are skipped by the blit and stay fully transparent on the page
+            pages[page_index].blit(surf, pos)
+            views[id(surf)] = pages[page_index].subsurface(pos, surf.get_size())
+        return views
@@ -0,0 +1,177 @@
+import os
+
+# keeps stdout clean for --json
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join
+
+from settings import *
+from game_data import game_data
+from monster import Monster
+from battle_engine import BattleEngine
+from battle_ai import get_policy
+from map_compiler import map_compiler, OBJECT_LAYER
+
+
+# rosters are plain tuples so they can be sent to the worker processes
+#   ('team', ((name, level), ...))             a fixed team
+#   ('wild', (name, ...), min_level, max_level) rolled for every battle like Game.monster_encounter
+def species_rosters(args):
+    return {name: ('team', ((name, args.level),)) for name in game_data.monster_data}
+
+
+def trainer_rosters(args):
+    return {key: ('team', tuple(tuple(monster) for monster in data['monsters'].values()))
+            for key, data in game_data.character_data.items() if data.get('monsters')}
+
+
+def wild_rosters(args):
+    # every distinct encounter table of the grass patches on the maps
+    rosters = {}
+    for file_name in sorted(os.listdir(join('..', 'data', 'maps'))):
+        parsed_map = map_compiler.parse(map_compiler.get_data(join('..', 'data', 'maps', file_name)))
+        for layer_name, kind, records in parsed_map['layers']:
+            if layer_name == 'Monsters' and kind == OBJECT_LAYER:
+                for *_, properties in records:
+                    names = tuple(properties['monsters'].split(','))
+                    label = f"{'/'.join(names)} {properties['min_level']}-{properties['max_level']}"
+                    rosters[label] = ('wild', names, properties['min_level'], properties['max_level'])
+    return rosters
+
+
+ROSTERS = {'species': species_rosters, 'trainers': trainer_rosters, 'wild': wild_rosters}
+
+
+def build_team(roster, rng):
+    if roster[0] == 'team':
+        return {index: Monster(name, level) for index, (name, level) in enumerate(roster[1])}
+    _, names, min_level, max_level = roster
+    return {index: Monster(rng.choice(names), rng.randint(min_level, max_level)) for index in range(rng.randint(1, 3))}
+
+
+def simulate(task):
+    """Play one chunk of battles between two rosters, the unit of work of the process pool."""
+    row, column, player_roster, opponent_roster, difficulties, battles, seed = task
+    rng = random.Random(seed)
+    player_policy, opponent_policy = (get_policy(difficulty, rng) for difficulty in difficulties)
+    tally = {'results': Counter(), 'species': Counter(), 'species_wins': Counter(), 'elements': Counter(),
+             'element_wins': Counter()}
+    for _ in range(battles):
+        player_team, opponent_team = build_team(player_roster, rng), build_team(opponent_roster, rng)
+        # recorded before the battle, evolutions and caught monsters don't change who fought
+        species = {(player.name, opponent.name) for player in player_team.values()
+                   for opponent in opponent_team.values()}
+        elements = {(player.element, opponent.element) for player in player_team.values()
+                    for opponent in opponent_team.values()}
+
+        winner = BattleEngine(player_team, opponent_team, rng).run(player_policy, opponent_policy)
+        tally['results'][winner] += 1
+        tally['species'].update(species)
+        tally['elements'].update(elements)
+        if winner == 'player':
+            tally['species_wins'].update(species)
+            tally['element_wins'].update(elements)
+    return row, column, tally
+
+
+def get_tasks(players, opponents, args):
+    # the seed of a chunk only depends on its position, so results don't change with the number of workers
+    # (unless a search policy runs into its time budget)
+    difficulties = (args.player_difficulty, args.opponent_difficulty)
+    tasks = []
+    for row, player_roster in players.items():
+        for column, opponent_roster in opponents.items():
+            for start in range(0, args.battles, args.chunk):
+                tasks.append((row, column, player_roster, opponent_roster, difficulties,
+                              min(args.chunk, args.battles - start), f'{args.seed} {len(tasks)}'))
+    return tasks
+
+
+def win_rates(wins, battles):
+    matrix = {}
+    for (row, column), count in sorted(battles.items()):
+        matrix.setdefault(row, {})[column] = wins[row, column] / count
+    return matrix
+
+
+def run_balance(args):
+    players, opponents = ROSTERS[args.player](args), ROSTERS[args.opponent](args)
+    tasks = get_tasks(players, opponents, args)
+
+    start = time.perf_counter()
+    if args.workers:
+        with ProcessPoolExecutor(args.workers) as executor:
+            results = list(executor.map(simulate, tasks, chunksize=max(1, len(tasks) // (args.workers * 4))))
+    else:
+        results = [simulate(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    outcomes, roster_wins, roster_battles = Counter(), Counter(), Counter()
+    totals = {'species': Counter(), 'species_wins': Counter(), 'elements': Counter(), 'element_wins': Counter()}
+    for row, column, tally in results:
+        outcomes.update(tally['results'])
+        roster_wins[row, column] += tally['results']['player']
+        roster_battles[row, column] += sum(tally['results'].values())
+        for name, counter in totals.items():
+            counter.update(tally[name])
+
+    battles = sum(outcomes.values())
+    return {
+        'summary': {'battles': battles, 'player_wins': outcomes['player'], 'opponent_wins': outcomes['opponent'],
+                    'draws': outcomes[None], 'seconds': elapsed, 'battles_per_second': battles / elapsed},
+        'rosters': win_rates(roster_wins, roster_battles),
+        'species': win_rates(totals['species_wins'], totals['species']),
+        'elements': win_rates(totals['element_wins'], totals['elements']),
+    }
+
+
+def print_matrix(title, matrix):
+    """Win rates of the row side in percent, - where the two never met."""
+    columns = sorted({column for row in matrix.values() for column in row})
+    label_width = max(len(label) for label in matrix) + 2
+    column_width = max(6, max(len(column) for column in columns) + 2)
+    print(f'\n{title}')
+    print(' ' * label_width + ''.join(f'{column:>{column_width}s}' for column in columns))
+    for label, row in matrix.items():
+        print(f'{label:{label_width}s}' + ''.join(
+            f'{row[column] * 100:{column_width}.0f}' if column in row else f"{'-':>{column_width}s}"
+            for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='rpg-game balance runner, simulates battles between rosters and '
+                                                 'prints the win rates of the player side, run from inside code/')
+    parser.add_argument('--player', choices=ROSTERS, default='species', help='rosters on the player side')
+    parser.add_argument('--opponent', choices=ROSTERS, default='species', help='rosters on the opponent side')
+    parser.add_argument('--player-difficulty', choices=AI_DIFFICULTY, default='easy', help='policy of the player side')
+    parser.add_argument('--opponent-difficulty', choices=AI_DIFFICULTY, default='easy',
+                        help='policy of the opponent side, easy picks at random')
+    parser.add_argument('--battles', type=int, default=200, help='battles per pair of rosters')
+    parser.add_argument('--level', type=int, default=10, help='level of the species rosters')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='0 simulates in this process')
+    parser.add_argument('--chunk', type=int, default=BALANCE_CHUNK_SIZE, help='battles per task of the pool')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print the results as json')
+    args = parser.parse_args()
+
+    results = run_balance(args)
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print(' '.join(f'{key}: {value:.2f}' if isinstance(value, float) else f'{key}: {value}'
+                       for key, value in results['summary'].items()))
+        if not args.player == args.opponent == 'species':
+            # with species rosters on both sides this is the species matrix again
+            print_matrix(f'{args.player} against {args.opponent}', results['rosters'])
+        print_matrix('species', results['species'])
+        print_matrix('elements', results['elements'])
+
+
+if __name__ == '__main__':
+    main()
@@ -5,26 +5,25 @@ from config_manager import config_manager
 from sprites import MonsterSprite, MonsterNameSprite, MonsterLevelSprite, MonsterStatsSprite, MonsterOutlineSprite, \
     AttackSprite, TimedSprite
 from groups import BattleSprites
+from battle_engine import BattleEngine
+from battle_ai import get_policy
 from game_data import game_data
 from support import draw_bar
 from timer import Timer
-from random import choice
 from debug import debug
+from profiler import profiler
 
 
 class Battle:
     # main
-    def __init__(self, player_monsters, opponent_monsters, monster_frames, bg_surf, fonts, end_battle, character,
-                 check_evolution, sounds):
+    def __init__(self, player_monsters, opponent_monsters, monster_frames, battle_frames, bg_surf, fonts, end_battle,
+                 character, check_evolution, sounds):
         self.draw_actions = False
         # general
         self.display_surface = pygame.display.get_surface()
-        self.monster_data = {
-            'player': [monster for monster in player_monsters.values()],
-            'opponent': [monster for monster in opponent_monsters.values()]
-        }
-        self.player_monsters_ref = player_monsters
+        self.engine = BattleEngine(player_monsters, opponent_monsters)
         self.monster_frames = monster_frames
+        self.battle_frames = battle_frames
         self.window_width = config_manager.settings['video']['window_width']
         self.window_height = config_manager.settings['video']['window_height']
         self.bg_surf = pygame.transform.scale(bg_surf, (self.window_width, self.window_height))
@@ -32,6 +31,9 @@ class Battle:
         self.battle_over = False
         self.end_battle = end_battle
         self.character = character
+        # trainers search their turns as hard as they are set up to, wild monsters pick at random
+        self.opponent_policy = get_policy(character.character_data.get('difficulty', AI_DEFAULT_DIFFICULTY)
+                                          if character else 'easy')
         self.check_evolution = check_evolution
 
         self.battle_positions = {
@@ -71,9 +73,7 @@ class Battle:
         self.battle_sprites = BattleSprites()
         self.player_sprites = pygame.sprite.Group()
         self.opponent_sprites = pygame.sprite.Group()
-
-        self.all_monsters = self.player_sprites.sprites() + self.opponent_sprites.sprites()
-        self.all_monsters.sort(key=lambda monster_sprite: monster_sprite.monster.get_stat('speed'), reverse=True)
+        self.monster_sprites = {}
         self.available_monsters = None
 
         # control
@@ -93,8 +93,6 @@ class Battle:
 
         # turn
         self.turn = False
-        self.turn_index = 0
-        self.actions_list = []
         self.action_index = 0
         self.executing_actions = False
 
@@ -108,37 +106,30 @@ class Battle:
         # sounds
         self.sounds = sounds
 
-        for monster_sprite in self.player_sprites.sprites() + self.opponent_sprites.sprites():
+        for monster_sprite in self.monster_sprites.values():
             monster_sprite.monster.paused = False
 
     # setup
     def setup(self):
-        for entity, monsters in self.monster_data.items():
-            alive_monsters = [monster for monster in monsters if monster.health > 0]
-
-            for index, monster in enumerate(alive_monsters[:3]):
-                self.create_monster(monster, index, index, entity)
-
-        monster_to_remove = min(len(self.monster_data['opponent']), 3)
-        for _ in range(monster_to_remove):
-            self.monster_data['opponent'].pop(0)
-
-    def create_monster(self, monster, index, pos_index, entity):
-        frames = self.monster_frames['monsters'][monster.name]
-        outline_frames = self.monster_frames['outlines'][monster.name]
+        # the engine decides who is on the field, the sprites follow
+        self.engine.on_spawn = self.create_monster
+        self.engine.on_remove = self.remove_monster
+        self.engine.setup()
+
+    def create_monster(self, combatant):
+        monster, entity = combatant.monster, combatant.side
+        # scaled and mirrored once per window size, spawning the same monster again reuses them
+        size = self.window_width // 10
+        frames = self.battle_frames.get('monsters', monster.name, entity, size)
+        outline_frames = self.battle_frames.get('outlines', monster.name, entity, size)
         if entity == 'player':
-            pos = list(self.battle_positions['left'].values())[pos_index]
-            groups = (self.battle_sprites, self.player_sprites)
-            frames = {state: [pygame.transform.flip(frame, True, False)
-                              for frame in frames] for state, frames in frames.items()}
-            outline_frames = {state: [pygame.transform.flip(frame, True, False)
-                                      for frame in frames] for state, frames in outline_frames.items()}
+            pos = list(self.battle_positions['left'].values())[combatant.pos_index]
         else:
-            pos = list(self.battle_positions['right'].values())[pos_index]
-            groups = (self.battle_sprites, self.opponent_sprites)
+            pos = list(self.battle_positions['right'].values())[combatant.pos_index]
 
-        monster_sprite = MonsterSprite(pos, frames, groups, monster, index, pos_index, entity, self.apply_attack,
-                                       self.create_monster)
+        monster_sprite = MonsterSprite(pos, frames, self.battle_sprites, combatant, self.apply_attack)
+        self.monster_sprites[combatant] = monster_sprite
+        self.update_side_groups()
         MonsterOutlineSprite(monster_sprite, self.battle_sprites, outline_frames)
 
         # ui
@@ -149,6 +140,18 @@ class Battle:
         MonsterStatsSprite(monster_sprite.rect.midbottom + vector(0, 30), monster_sprite, (150, 48),
                            self.battle_sprites, self.fonts['small'])
 
+    def remove_monster(self, combatant):
+        # the name, level, stats and outline sprites follow once the monster sprite has no groups left
+        self.monster_sprites.pop(combatant).kill()
+        self.update_side_groups()
+
+    def update_side_groups(self):
+        # in the order of their positions, which is what target selection counts in
+        self.player_sprites = pygame.sprite.Group(
+            [self.monster_sprites[combatant] for combatant in self.engine.sides['player']])
+        self.opponent_sprites = pygame.sprite.Group(
+            [self.monster_sprites[combatant] for combatant in self.engine.sides['opponent']])
+
     # input
     def input(self):
         if self.selection_mode and self.current_monster and not self.selected:
@@ -191,31 +194,19 @@ class Battle:
                         monster_sprite = sprites[list(sprites.keys())[self.ui_indexes['target']]]
 
                         if self.selected_attack:
-                            if (self.current_monster.monster.energy >=
-                                    game_data.attack_data[self.selected_attack]['cost']):
+                            if self.engine.can_attack(self.current_monster.combatant, self.selected_attack):
                                 self.selected = True
-                                self.actions_list.append(
-                                    {
-                                        'index': self.turn_index,
-                                        'action': 'activate_attack',
-                                        'selected_attack': self.selected_attack,
-                                        'target': monster_sprite
-                                    }
-                                )
+                                self.engine.add_action(self.current_monster.combatant, 'activate_attack',
+                                                       monster_sprite.combatant, self.selected_attack)
                                 self.next_turn()
                             else:
                                 TimedSprite(self.current_monster.rect.center, self.monster_frames['ui']['cross'],
                                             self.battle_sprites, 1000)
                         else:
-                            if monster_sprite.monster.health < monster_sprite.monster.get_stat('max_health') * 0.9:
+                            if self.engine.can_catch(monster_sprite.combatant):
                                 self.selected = True
-                                self.actions_list.append(
-                                    {
-                                        'index': self.turn_index,
-                                        'action': 'catch',
-                                        'target': monster_sprite
-                                    }
-                                )
+                                self.engine.add_action(self.current_monster.combatant, 'catch',
+                                                       monster_sprite.combatant)
                                 self.next_turn()
                             else:
                                 TimedSprite(monster_sprite.rect.center, self.monster_frames['ui']['cross'],
@@ -228,10 +219,8 @@ class Battle:
                         self.ui_indexes = {k: 0 for k in self.ui_indexes}
                     case 'defend':
                         if self.ui_indexes['defend'] == 0:
-                            if self.current_monster.monster.energy > 0 and not self.current_monster.monster.defending:
-                                self.current_monster.monster.defending = True
-                                self.current_monster.monster.energy -= 1
-                                if self.current_monster.monster.energy <= 0:
+                            if self.engine.can_defend(self.current_monster.combatant):
+                                if self.engine.defend(self.current_monster.combatant):
                                     self.selected = True
                                     self.next_turn()
                                 else:
@@ -245,12 +234,7 @@ class Battle:
                         if self.available_monsters.items():
                             self.selected = True
                             new_monster = list(self.available_monsters.items())[self.ui_indexes['switch']]
-                            new_monster_index = self.turn_index
-                            self.current_monster.kill()
-                            self.create_monster(new_monster[1], new_monster[0],
-                                                self.all_monsters[new_monster_index].pos_index, 'player')
-                            self.player_sprites = pygame.sprite.Group(
-                                sorted(self.player_sprites.sprites(), key=lambda sprite: sprite.pos_index))
+                            self.engine.switch(self.current_monster.combatant, *new_monster)
                             self.next_turn()
                         else:
                             self.selection_mode = 'general'
@@ -394,9 +378,7 @@ class Battle:
         pygame.draw.rect(self.display_surface, COLORS['light'], bg_rect, 0, 5)
 
         # monsters
-        active_monsters = [monster_sprite.monster for monster_sprite in self.player_sprites]
-        self.available_monsters = {index: monster for index, monster in enumerate(self.monster_data['player'])
-                                   if monster.health > 0 and monster not in active_monsters}
+        self.available_monsters = self.engine.get_switch_options()
         for index, monster in enumerate(self.available_monsters.values()):
             selected = index == self.ui_indexes['switch']
             item_bg_rect = pygame.FRect((0, 0), (width, item_height)) \
@@ -461,15 +443,15 @@ class Battle:
     # battle system
     def check_active(self):
         if not self.turn:
-            if self.turn_index < len(self.all_monsters):
+            combatant = self.engine.start_turn()
+            if combatant:
                 self.turn = True
-                self.current_monster = self.all_monsters[self.turn_index]
+                self.current_monster = self.monster_sprites[combatant]
                 self.selected = False
-                self.current_monster.monster.defending = False
-                if self.current_monster in self.player_sprites:
+                if combatant.side == 'player':
                     self.selection_mode = 'general'
                 else:
-                    self.opponent_attack()
+                    self.engine.take_turn(combatant, self.opponent_policy)
                     self.next_turn()
             else:
                 if self.action_index == 0:
@@ -489,40 +471,32 @@ class Battle:
 
     def next_turn(self):
         self.ui_indexes = {k: 0 for k in self.ui_indexes}
-        self.current_monster.active = False
         self.current_monster = None
-        self.turn_index += 1
+        self.engine.next_turn()
         self.action_index = 0
         self.turn = False
         self.selection_mode = 'general'
         self.selected = False
 
     def execute_actions(self):
-        self.player_sprites = pygame.sprite.Group(
-            sorted(self.player_sprites.sprites(), key=lambda sprite: sprite.pos_index))
-        self.opponent_sprites = pygame.sprite.Group(
-            sorted(self.opponent_sprites.sprites(), key=lambda sprite: sprite.pos_index))
+        # one action per timer run, so every attack gets to play its animation
         if not self.timers['action'].active:
-            if self.action_index < len(self.actions_list):
+            actions = self.engine.actions_list
+            while self.action_index < len(actions) and not self.engine.can_execute(actions[self.action_index]):
+                self.action_index += 1
+
+            if self.action_index < len(actions):
                 self.timers['action'].activate()
-                action = self.actions_list[self.action_index]
-                if self.all_monsters[action['index']].alive and action['target'].alive:
-                    match action['action']:
-                        case 'activate_attack':
-                            self.all_monsters[action['index']].activate_attack(action['target'],
-                                                                               action['selected_attack'])
-                        case 'switch_monster':
-                            pass
-                        case 'catch':
-                            self.monster_data['player'].append(action['target'].monster)
-                            self.player_monsters_ref[len(self.player_monsters_ref)] = action['target'].monster
-                            action['target'].instant_kill(None)
-                        case _:
-                            debug(f'Something went wrong when attempting to execute action: {action["action"]}!')
-                else:
-                    self.timers['action'].deactivate()
-                    self.action_index += 1
-                    self.execute_actions()
+                action = actions[self.action_index]
+                match action['action']:
+                    case 'activate_attack':
+                        self.engine.activate_attack(action['combatant'], action['selected_attack'])
+                        self.monster_sprites[action['combatant']].activate_attack(
+                            self.monster_sprites[action['target']], action['selected_attack'])
+                    case 'catch':
+                        self.engine.catch(action['target'])
+                    case _:
+                        debug(f'Something went wrong when attempting to execute action: {action["action"]}!')
                 self.action_index += 1
             else:
                 self.round_over()
@@ -530,15 +504,9 @@ class Battle:
     def round_over(self):
         self.timers['action'].deactivate()
         self.action_index = 0
-        self.turn_index = 0
         self.turn = False
         self.executing_actions = False
-        self.all_monsters = self.player_sprites.sprites() + self.opponent_sprites.sprites()
-        self.all_monsters.sort(
-            key=lambda monster_sprite: monster_sprite.monster.get_stat('speed'), reverse=True)
-        for monster in self.all_monsters:
-            monster.monster.energy = monster.monster.get_stat('max_energy')
-        self.actions_list.clear()
+        self.engine.round_over()
 
     def apply_attack(self, target_sprite, attack, amount):
         # Play the attack animation
@@ -549,90 +517,19 @@ class Battle:
         )
         self.sounds['sfx_' + game_data.attack_data[attack]['animation']].play()
 
-        # Get correct attack damage amount (defense, element)
-        attack_element = game_data.attack_data[attack]['element']
-        target_element = target_sprite.monster.element
-
-        # Check for vulnerabilities
-        if target_element in ELEMENT_RELATIONSHIPS.get(attack_element, {}).get('vulnerable_to', []):
-            amount *= 2
-        # Check for resistances
-        if target_element in ELEMENT_RELATIONSHIPS.get(attack_element, {}).get('resistant_to', []):
-            amount *= 0.5
-
-        # get fraction of the damage by targets defense
-        target_defense = 1 - target_sprite.monster.get_stat('defense') / 2000
-        if target_sprite.monster.defending:
-            target_defense -= 0.2
-        target_defense = max(0, min(1, target_defense))
-
-        # Apply the attack damage to the target
-        target_sprite.monster.health -= int(amount * target_defense)
-        self.check_death(target_sprite)
-
-    def opponent_attack(self):
-        ability = choice(self.current_monster.monster.get_abilities())
-        random_target = choice(self.opponent_sprites.sprites()) if game_data.attack_data[ability]['side'] == 'player' \
-            else choice(self.player_sprites.sprites())
-        self.actions_list.append(
-            {
-                'index': self.turn_index,
-                'action': 'activate_attack',
-                'selected_attack': ability,
-                'target': random_target
-            }
-        )
-
-    def check_death(self, monster_sprite):
-        if monster_sprite.monster.health <= 0:
-            monster_sprite.alive = False
-            self.apply_death(monster_sprite)
-
-    def apply_death(self, monster_sprite):
-        if not monster_sprite.alive:
-            if self.player_sprites in monster_sprite.groups():  # player
-                active_monsters = [active_monster_sprite.monster for
-                                   active_monster_sprite in self.player_sprites.sprites()]
-                available_monsters = [monster for monster in self.monster_data['player']
-                                      if monster.health > 0 and monster not in active_monsters]
-                if available_monsters:
-                    new_monster_index = -1
-                    for index, sprite in enumerate(self.player_sprites):
-                        if sprite == monster_sprite:
-                            new_monster_index = index
-                    monster = available_monsters[0]
-                    new_monster_data = (monster, new_monster_index, monster_sprite.pos_index, 'player')
-                    print(new_monster_data)
-                else:
-                    new_monster_data = None
-            else:  # enemy
-                # replace with new if available
-                new_monster_data = (self.monster_data['opponent'][0], monster_sprite.index,
-                                    monster_sprite.pos_index, 'opponent') if self.monster_data['opponent'] else None
-                if self.monster_data['opponent']:
-                    self.monster_data['opponent'].pop(0)
-
-                # xp
-                defender_level = monster_sprite.monster.level
-                for player_sprite in self.player_sprites:
-                    attacker_level = player_sprite.monster.level
-                    xp_amount = 50 * attacker_level * defender_level
-                    player_sprite.monster.update_exp(xp_amount)
-
-            # kill existing
-            monster_sprite.instant_kill(new_monster_data)
+        self.engine.apply_attack(target_sprite.combatant, attack, amount)
 
     def check_end_battle(self):
+        winner = self.engine.get_winner()
         # player wins
-        if len(self.opponent_sprites) == 0 and not self.battle_over:
+        if winner == 'player' and not self.battle_over:
             self.round_over()
             self.check_evolution()
             self.battle_over = True
-            for monster in self.monster_data['player']:
-                monster.energy = monster.get_stat('max_energy')
+            self.engine.restore_energy()
             self.end_battle(self.character)
         # opponent wins
-        elif len(self.player_sprites) == 0 and not self.battle_over:
+        elif winner == 'opponent' and not self.battle_over:
             self.battle_over = True
             pygame.quit()
             exit()
@@ -640,24 +537,22 @@ class Battle:
     # update
     def update(self, dt):
         # updates
-        self.check_end_battle()
-        if not self.battle_over:
-            self.check_active()
-            self.battle_sprites.update(dt)
-            if not self.executing_actions:
-                self.input()
-            for timer in self.timers.values():
-                timer.update()
+        with profiler.scope('battle.update'):
+            self.check_end_battle()
+            if not self.battle_over:
+                self.check_active()
+                self.battle_sprites.update(dt)
+                if not self.executing_actions:
+                    self.input()
+                for timer in self.timers.values():
+                    timer.update()
 
         # drawing
-        self.display_surface.blit(self.bg_surf, (0, 0))
-        self.battle_sprites.draw_sprites(self.current_monster, self.selection_side, self.selection_mode,
-                                         self.ui_indexes['target'], self.player_sprites, self.opponent_sprites)
-        self.draw_ui()
-        debug_str = ""
-        if self.player_sprites:
-            for monster in self.player_sprites:
-                debug_str += str(monster)
-        debug(debug_str)
+        with profiler.scope('battle.draw'):
+            self.display_surface.blit(self.bg_surf, (0, 0))
+            self.battle_sprites.draw_sprites(self.current_monster, self.selection_side, self.selection_mode,
+                                             self.ui_indexes['target'], self.player_sprites, self.opponent_sprites)
+            self.draw_ui()
+        profiler.count('battle sprites', len(self.battle_sprites))
 
         if self.draw_actions: self.draw_text_field()
@@ -0,0 +1,124 @@
+import math
+import random
+import time
+from settings import *
+from battle_engine import random_policy
+
+
+def rollout_policy(engine, combatant):
+    # random like random_policy, but only abilities there is energy for, which is what the player is held to
+    abilities = [ability for ability in combatant.monster.get_abilities() if engine.can_attack(combatant, ability)]
+    if not abilities:
+        return {'action': 'pass'}
+    ability = engine.rng.choice(abilities)
+    return {'action': 'activate_attack', 'selected_attack': ability,
+            'target': engine.rng.choice(engine.get_targets(combatant, ability))}
+
+
+def get_team(engine, side):
+    # the player keeps the whole party in monster_data, opponents only the ones still to come
+    if side == 'player':
+        return engine.monster_data['player']
+    return [combatant.monster for combatant in engine.sides['opponent']] + engine.monster_data['opponent']
+
+
+def get_health(team):
+    return sum(max(0, monster.health) / monster.get_stat('max_health') for monster in team) / max(1, len(team))
+
+
+def evaluate(engine, side):
+    """How good the battle looks for a side, the health left on both teams and a bonus for having won."""
+    other_side = 'opponent' if side == 'player' else 'player'
+    value = get_health(get_team(engine, side)) - get_health(get_team(engine, other_side))
+    winner = engine.get_winner()
+    if winner:
+        value += 1 if winner == side else -1
+    return value
+
+
+class SearchPolicy:
+    """Picks a turn by Monte Carlo search on copies of the battle: every candidate action is played out with
+    random turns for a few rounds, the candidates that look best get the most playouts (UCB1), until the
+    iterations or the time budget of the turn run out."""
+    def __init__(self, iterations, depth, budget=AI_TIME_BUDGET_MS, rng=None):
+        self.iterations = iterations
+        self.depth = depth
+        self.budget = budget
+        self.rng = rng or random.Random()
+
+        # the turn the budget belongs to, a monster that defends is asked again within the same turn
+        self.turn_combatant = None
+        self.turn_deadline = 0
+
+    @staticmethod
+    def get_candidates(engine, combatant):
+        # targets are kept as side and position, so they can be looked up again in a copy
+        candidates = []
+        for ability in combatant.monster.get_abilities():
+            if engine.can_attack(combatant, ability):
+                for target in engine.get_targets(combatant, ability):
+                    candidates.append(('activate_attack', ability, target.side,
+                                       engine.sides[target.side].index(target)))
+        if engine.can_defend(combatant):
+            candidates.append(('defend', None, None, None))
+        return candidates or [('pass', None, None, None)]
+
+    @staticmethod
+    def get_action(engine, candidate):
+        action, ability, side, index = candidate
+        return {'action': action, 'selected_attack': ability, 'target': engine.sides[side][index] if side else None}
+
+    def playout(self, engine, candidate):
+        copy = engine.copy(self.rng)
+        combatant = copy.all_monsters[copy.turn_index]
+        # the candidate is the first choice of this turn, anything after a defend is up to the rollout
+        choices = [self.get_action(copy, candidate)]
+
+        def policy(engine, combatant):
+            return choices.pop() if choices else rollout_policy(engine, combatant)
+
+        copy.take_turn(combatant, policy)
+        copy.next_turn()
+        copy.play({'player': rollout_policy, 'opponent': rollout_policy}, self.depth)
+        return evaluate(copy, combatant.side)
+
+    def get_deadline(self, combatant):
+        if not (combatant is self.turn_combatant and combatant.monster.defending):
+            self.turn_combatant = combatant
+            self.turn_deadline = time.perf_counter() + self.budget / 1000
+        return self.turn_deadline
+
+    def __call__(self, engine, combatant):
+        deadline = self.get_deadline(combatant)
+        candidates = self.get_candidates(engine, combatant)
+        if len(candidates) == 1:
+            return self.get_action(engine, candidates[0])
+
+        totals, visits = [0] * len(candidates), [0] * len(candidates)
+        start = time.perf_counter()
+        for iteration in range(self.iterations):
+            # stop before a playout that would probably end past the deadline
+            now = time.perf_counter()
+            if iteration and now + (now - start) / iteration > deadline or now > deadline:
+                break
+            if iteration < len(candidates):
+                index = iteration
+            else:
+                exploration = math.log(iteration)
+                index = max(range(len(candidates)), key=lambda i: totals[i] / visits[i] +
+                            AI_EXPLORATION * math.sqrt(exploration / visits[i]))
+            totals[index] += self.playout(engine, candidates[index])
+            visits[index] += 1
+
+        if not any(visits):
+            return self.get_action(engine, self.rng.choice(candidates))
+        best = max((i for i in range(len(candidates)) if visits[i]), key=lambda i: totals[i] / visits[i])
+        return self.get_action(engine, candidates[best])
+
+
+def get_policy(difficulty, rng=None):
+    """The policy for a difficulty from AI_DIFFICULTY, easy keeps the old random turns."""
+    settings = AI_DIFFICULTY.get(difficulty, AI_DIFFICULTY[AI_DEFAULT_DIFFICULTY])
+    if not settings['iterations']:
+        return random_policy
+    return SearchPolicy(settings['iterations'], settings['depth'], rng=rng)
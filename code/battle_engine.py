@@ -0,0 +1,276 @@
+import copy
+import random
+from settings import *
+from game_data import game_data
+from damage import ATTACK_IDS, ATTACK_ELEMENTS, get_damage
+
+
+class Combatant:
+    """A monster on the battlefield, what a MonsterSprite shows."""
+    def __init__(self, monster, side, index, pos_index):
+        self.monster = monster
+        self.side = side
+        self.index = index
+        self.pos_index = pos_index
+        self.alive = True
+
+    def __repr__(self):
+        return f"{self.monster} ({self.side} {self.pos_index})"
+
+
+def random_policy(engine, combatant):
+    # any unlocked ability on a random target, how opponents have always picked their turn
+    ability = engine.rng.choice(combatant.monster.get_abilities())
+    return {'action': 'activate_attack', 'selected_attack': ability,
+            'target': engine.rng.choice(engine.get_targets(combatant, ability))}
+
+
+class BattleEngine:
+    """The battle rules without display, input or timers, Battle drives them frame by frame and run() plays a whole
+    battle at once."""
+    def __init__(self, player_monsters, opponent_monsters, rng=None):
+        self.monster_data = {
+            'player': [monster for monster in player_monsters.values()],
+            'opponent': [monster for monster in opponent_monsters.values()]
+        }
+        self.player_monsters_ref = player_monsters
+        self.rng = rng or random
+
+        # monsters on the field by side, sorted by their position
+        self.sides = {'player': [], 'opponent': []}
+
+        # turn
+        self.all_monsters = []
+        self.turn_index = 0
+        self.actions_list = []
+        self.rounds = 0
+
+        # the view listens to these to create and remove sprites
+        self.on_spawn = self.on_remove = lambda combatant: None
+
+    # setup
+    def setup(self):
+        for side, monsters in self.monster_data.items():
+            alive_monsters = [monster for monster in monsters if monster.health > 0]
+
+            for index, monster in enumerate(alive_monsters[:3]):
+                self.spawn(monster, index, index, side)
+
+        # the opponents on the field leave the queue of the ones still to come
+        del self.monster_data['opponent'][:3]
+
+    def spawn(self, monster, index, pos_index, side):
+        combatant = Combatant(monster, side, index, pos_index)
+        self.sides[side].append(combatant)
+        self.sides[side].sort(key=lambda other: other.pos_index)
+        self.on_spawn(combatant)
+        return combatant
+
+    def remove(self, combatant):
+        combatant.alive = False
+        self.sides[combatant.side].remove(combatant)
+        self.on_remove(combatant)
+
+    # turns
+    def start_turn(self):
+        """The combatant whose turn it is, None once every one of them has chosen."""
+        if self.turn_index < len(self.all_monsters):
+            combatant = self.all_monsters[self.turn_index]
+            combatant.monster.defending = False
+            return combatant
+        return None
+
+    def next_turn(self):
+        self.turn_index += 1
+
+    def take_turn(self, combatant, policy):
+        action = policy(self, combatant)
+        if action['action'] == 'defend':
+            if not self.can_defend(combatant) or self.defend(combatant):
+                return
+            # defending only ends the turn once the energy runs out
+            action = policy(self, combatant)
+
+        match action['action']:
+            case 'activate_attack':
+                self.add_action(combatant, 'activate_attack', action['target'], action['selected_attack'])
+            case 'catch':
+                self.add_action(combatant, 'catch', action['target'])
+            case 'switch':
+                self.switch(combatant, *action['monster'])
+
+    def add_action(self, combatant, action, target, attack=None):
+        self.actions_list.append({'combatant': combatant, 'action': action, 'selected_attack': attack,
+                                  'target': target})
+
+    def round_over(self):
+        self.turn_index = 0
+        self.actions_list.clear()
+        self.rounds += 1
+        self.all_monsters = self.sides['player'] + self.sides['opponent']
+        self.all_monsters.sort(key=lambda combatant: combatant.monster.get_stat('speed'), reverse=True)
+        for combatant in self.all_monsters:
+            combatant.monster.energy = combatant.monster.get_stat('max_energy')
+
+    # choices
+    def get_targets(self, combatant, attack):
+        # 'player' side attacks go to the attacker's own side, whichever side that is
+        if game_data.attack_data[attack]['side'] == 'player':
+            return self.sides[combatant.side]
+        return self.sides['opponent' if combatant.side == 'player' else 'player']
+
+    @staticmethod
+    def can_attack(combatant, attack):
+        return combatant.monster.energy >= game_data.attack_data[attack]['cost']
+
+    @staticmethod
+    def can_catch(target):
+        return target.monster.health < target.monster.get_stat('max_health') * 0.9
+
+    @staticmethod
+    def can_defend(combatant):
+        return combatant.monster.energy > 0 and not combatant.monster.defending
+
+    @staticmethod
+    def defend(combatant):
+        """Defend until the next turn, returns whether that used up the last energy and so ends the turn."""
+        combatant.monster.defending = True
+        combatant.monster.energy -= 1
+        return combatant.monster.energy <= 0
+
+    def get_switch_options(self):
+        active_monsters = [combatant.monster for combatant in self.sides['player']]
+        return {index: monster for index, monster in enumerate(self.monster_data['player'])
+                if monster.health > 0 and monster not in active_monsters}
+
+    def switch(self, combatant, index, monster):
+        self.remove(combatant)
+        self.spawn(monster, index, combatant.pos_index, combatant.side)
+
+    # actions
+    @staticmethod
+    def can_execute(action):
+        # actions of monsters that fainted, were caught or switched out in the meantime are skipped
+        return action['combatant'].alive and action['target'].alive
+
+    def execute(self, action):
+        match action['action']:
+            case 'activate_attack':
+                self.activate_attack(action['combatant'], action['selected_attack'])
+                self.apply_attack(action['target'], action['selected_attack'],
+                                  action['combatant'].monster.get_base_damage(action['selected_attack']))
+            case 'catch':
+                self.catch(action['target'])
+
+    @staticmethod
+    def activate_attack(combatant, attack):
+        combatant.monster.reduce_energy(attack)
+        combatant.monster.stat_limiter()
+
+    def apply_attack(self, target, attack, amount):
+        # the damage after elements and defense
+        target.monster.health -= get_damage(amount, ATTACK_ELEMENTS[ATTACK_IDS[attack]], target.monster.element_id,
+                                            target.monster.get_stat('defense'), target.monster.defending)
+        if target.monster.health <= 0:
+            self.apply_death(target)
+        else:
+            # heals stop at the max health
+            target.monster.stat_limiter()
+
+    def catch(self, target):
+        self.monster_data['player'].append(target.monster)
+        self.player_monsters_ref[len(self.player_monsters_ref)] = target.monster
+        self.remove(target)
+
+    def apply_death(self, combatant):
+        if combatant.side == 'player':
+            # replace with the first monster that can still fight
+            active_monsters = [active.monster for active in self.sides['player']]
+            available_monsters = [monster for monster in self.monster_data['player']
+                                  if monster.health > 0 and monster not in active_monsters]
+            new_monster_data = (available_monsters[0], self.sides['player'].index(combatant),
+                                combatant.pos_index, 'player') if available_monsters else None
+        else:
+            # replace with new if available
+            new_monster_data = (self.monster_data['opponent'].pop(0), combatant.index, combatant.pos_index,
+                                'opponent') if self.monster_data['opponent'] else None
+
+            # xp
+            defender_level = combatant.monster.level
+            for player_combatant in self.sides['player']:
+                attacker_level = player_combatant.monster.level
+                xp_amount = 50 * attacker_level * defender_level
+                player_combatant.monster.update_exp(xp_amount)
+
+        self.remove(combatant)
+        if new_monster_data:
+            self.spawn(*new_monster_data)
+
+    def execute_actions(self):
+        for action in self.actions_list:
+            if self.can_execute(action):
+                self.execute(action)
+                if self.get_winner():
+                    break
+
+    # end
+    def get_winner(self):
+        if not self.sides['opponent']:
+            return 'player'
+        if not self.sides['player']:
+            return 'opponent'
+        return None
+
+    def restore_energy(self):
+        for monster in self.monster_data['player']:
+            monster.energy = monster.get_stat('max_energy')
+
+    def play(self, policies, max_rounds):
+        """Carry on from the current turn until there is a winner or max_rounds rounds, this one included, are over."""
+        last_round = self.rounds + max_rounds - 1
+        while True:
+            while combatant := self.start_turn():
+                self.take_turn(combatant, policies[combatant.side])
+                self.next_turn()
+            self.execute_actions()
+            if self.get_winner() or self.rounds >= last_round:
+                return self.get_winner()
+            self.round_over()
+
+    def run(self, player_policy=random_policy, opponent_policy=random_policy, max_rounds=BATTLE_MAX_ROUNDS):
+        """Play a whole battle at once, returns the winning side or None if it is still going after max_rounds."""
+        self.setup()
+        self.round_over()
+        winner = self.play({'player': player_policy, 'opponent': opponent_policy}, max_rounds)
+        if winner == 'player':
+            self.restore_energy()
+        return winner
+
+    def copy(self, rng=None):
+        """A copy to play ahead on, with copies of the monsters and nothing listening to it."""
+        monsters, combatants = {}, {}
+
+        def copy_monster(monster):
+            if id(monster) not in monsters:
+                monsters[id(monster)] = copy.copy(monster)
+            return monsters[id(monster)]
+
+        def copy_combatant(combatant):
+            if id(combatant) not in combatants:
+                combatants[id(combatant)] = new_combatant = copy.copy(combatant)
+                new_combatant.monster = copy_monster(combatant.monster)
+            return combatants[id(combatant)]
+
+        engine = copy.copy(self)
+        engine.monster_data = {side: [copy_monster(monster) for monster in monsters_list]
+                               for side, monsters_list in self.monster_data.items()}
+        # catches in a copy don't reach the real party
+        engine.player_monsters_ref = {}
+        engine.rng = rng or self.rng
+        engine.sides = {side: [copy_combatant(combatant) for combatant in side_list]
+                        for side, side_list in self.sides.items()}
+        engine.all_monsters = [copy_combatant(combatant) for combatant in self.all_monsters]
+        engine.actions_list = [{**action, 'combatant': copy_combatant(action['combatant']),
+                                'target': copy_combatant(action['target'])} for action in self.actions_list]
+        engine.on_spawn = engine.on_remove = lambda combatant: None
+        return engine
@@ -0,0 +1,25 @@
+from settings import *
+
+
+class BattleFrames:
+    """Monster and outline frames at their battle size, mirrored for the player side, made once per window size."""
+    def __init__(self, monster_frames):
+        self.monster_frames = monster_frames
+        self.frames = {}
+
+    def get(self, kind, monster, side, size):
+        key = (kind, monster, side, size)
+        if key not in self.frames:
+            self.frames[key] = {state: [self.transform(frame, side, size) for frame in frames]
+                                for state, frames in self.monster_frames[kind][monster].items()}
+        return self.frames[key]
+
+    @staticmethod
+    def transform(frame, side, size):
+        # player monsters face right, the source frames face left
+        if side == 'player':
+            frame = pygame.transform.flip(frame, True, False)
+        return pygame.transform.scale(frame, (size, size))
+
+    def clear(self):
+        self.frames.clear()
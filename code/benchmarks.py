@@ -0,0 +1,390 @@
+import os
+
+# benchmarks run without a window or a sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# keeps stdout clean for --json
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+import tracemalloc
+import pygame
+from os.path import join
+
+from settings import *
+from config_manager import config_manager
+from game_data import game_data
+import support
+import timer
+from map_compiler import map_compiler, MapCompiler
+
+
+def get_loaders():
+    """The timed importers by name, outline_creator and the atlas get their input built once up front."""
+    from game import Game
+    from atlas import TextureAtlas
+    from asset_cache import asset_cache
+
+    monsters = support.import_monster(4, 2, '..', 'graphics', 'monsters')
+    monster_frames = {'monsters': monsters, 'outlines': support.outline_creator(monsters, 4)}
+    return {
+        'water': (support.import_folder, ('..', 'graphics', 'tilesets', 'water')),
+        'coast': (support.import_coastline, (24, 12, '..', 'graphics', 'tilesets', 'coast')),
+        'tilemap': (support.import_tilemap, (4, 4, '..', 'graphics', 'characters', 'player')),
+        'characters': (support.import_all_characters, ('..', 'graphics', 'characters')),
+        'icons': (support.import_folder_dict, ('..', 'graphics', 'icons')),
+        'monsters': (support.import_monster, (4, 2, '..', 'graphics', 'monsters')),
+        'outlines': (support.outline_creator, (monsters, 4)),
+        'attacks': (support.import_attacks, ('..', 'graphics', 'attacks')),
+        'ui': (support.import_folder_dict, ('..', 'graphics', 'ui')),
+        'backgrounds': (support.import_folder_dict, ('..', 'graphics', 'backgrounds')),
+        'stars': (support.import_folder, ('..', 'graphics', 'other', 'star animation')),
+        'atlas': (lambda frames: TextureAtlas().pack(frames), (monster_frames,)),
+        'frame_cache': (asset_cache.load, ('frames', Game.import_frames, join('..', 'graphics'))),
+    }
+
+
+# scripted run of the game: keys held for a number of frames on the world map
+WALK_ROUTE = [('d', 90), ('s', 60), ('a', 120), ('w', 90), ('d', 60)]
+TRANSITION_FRAMES = 150
+# a battle runs until it is over, a scripted fight that needs more frames than this is stuck
+BATTLE_MAX_FRAMES = 6000
+BATTLE_CONFIRM_INTERVAL = 12
+
+
+def init_display():
+    pygame.init()
+    config_manager.settings['video']['window_width'], config_manager.settings['video']['window_height'] = \
+        DEFAULT_WINDOW_SIZE
+    pygame.display.set_mode(DEFAULT_WINDOW_SIZE)
+
+
+def time_call(function, *args, repeat=1):
+    """Best wall time of repeat calls in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def collect_surfaces(data, surfaces):
+    if isinstance(data, dict):
+        for value in data.values():
+            collect_surfaces(value, surfaces)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            collect_surfaces(value, surfaces)
+    elif isinstance(data, pygame.Surface):
+        surfaces[id(data)] = data
+    return surfaces
+
+
+def count_surfaces(data):
+    """Surfaces in a loader result, the pixel buffers behind them and their size in MB."""
+    surfaces = collect_surfaces(data, {}).values()
+    # subsurfaces share the buffer of their parent
+    buffers = {id(surf.get_abs_parent()): surf.get_abs_parent() for surf in surfaces}.values()
+    pixel_bytes = sum(surf.get_width() * surf.get_height() * surf.get_bytesize() for surf in buffers)
+    return len(surfaces), len(buffers), pixel_bytes / 1024 ** 2
+
+
+def trace_call(function, *args):
+    """Peak and retained python allocations of one call in KB, pixel buffers live outside of tracemalloc."""
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = function(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, (peak - start) / 1024, (retained - start) / 1024
+
+
+def bench_loaders(args):
+    init_display()
+    support.image_loader_threads = args.threads
+    results = {}
+    for name, (function, function_args) in get_loaders().items():
+        # the first call warms up file caches and fills the asset cache if it is stale
+        function(*function_args)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            function(*function_args)
+            times.append((time.perf_counter() - start) * 1000)
+        result, peak, retained = trace_call(function, *function_args)
+        surfaces, buffers, pixel_mb = count_surfaces(result)
+
+        # the same loader decoding serially, against the pool above
+        support.image_loader_threads = 0
+        serial_ms = time_call(function, *function_args, repeat=args.repeat)
+        support.image_loader_threads = args.threads
+
+        results[name] = {'mean_ms': statistics.fmean(times), 'min_ms': min(times), 'serial_ms': serial_ms,
+                         'speedup': serial_ms / min(times), 'peak_kb': peak, 'retained_kb': retained,
+                         'surfaces': surfaces, 'buffers': buffers, 'pixel_mb': pixel_mb}
+    support.image_loader_threads = IMAGE_LOADER_THREADS
+    return results
+
+
+def bench_maps(args):
+    init_display()
+    results = {}
+    for file_name in sorted(os.listdir(join('..', 'data', 'maps'))):
+        tmx_path = join('..', 'data', 'maps', file_name)
+        map_compiler.load(tmx_path)
+        results[file_name.split('.')[0]] = {
+            'pytmx': time_call(support.load_pygame, tmx_path, repeat=args.repeat),
+            'compile': time_call(map_compiler.compile, tmx_path, repeat=args.repeat),
+            # cold starts with a fresh compiler, warm reuses the tiles the other maps already converted
+            'compiled_cold': time_call(lambda: MapCompiler().load(tmx_path), repeat=args.repeat),
+            'compiled_warm': time_call(map_compiler.load, tmx_path, repeat=args.repeat),
+        }
+    return results
+
+
+class SimulatedClock:
+    """Stands in for pygame.time.get_ticks in the timers, so they run on the simulated frame time like everything
+    else and a scripted run takes the same frames on any machine."""
+    def __init__(self, dt):
+        self.dt = dt
+        self.ticks = 0
+
+    def get_ticks(self):
+        return int(self.ticks)
+
+    def tick(self):
+        self.ticks += self.dt
+
+
+class KeyState:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+class ScriptedInput:
+    """Stands in for pygame.key, the script decides which keys are held and tapped each frame."""
+    def __init__(self):
+        self.held, self.tapped = set(), set()
+        pygame.key.get_pressed = lambda: KeyState(self.held)
+        pygame.key.get_just_pressed = lambda: KeyState(self.tapped)
+
+    def set(self, held=(), tapped=()):
+        self.held = {pygame.key.key_code(key) for key in held}
+        self.tapped = {pygame.key.key_code(key) for key in tapped}
+
+
+def walk_route(game, scripted_input, stats):
+    for key, frames in WALK_ROUTE:
+        for _ in range(frames):
+            scripted_input.set(held=(key,))
+            yield
+
+
+def enter_transition(game, scripted_input, stats):
+    # stand in the hospital door, wait out both fades, then leave through the hospital exit
+    for target in ('hospital', 'world'):
+        door = next(sprite for sprite in game.transition_sprites if sprite.target[0] == target)
+        game.player.rect.center = game.player.hitbox.center = door.rect.center
+        for _ in range(TRANSITION_FRAMES):
+            scripted_input.set()
+            yield
+
+
+def fight_battle(game, scripted_input, stats):
+    # step into the first grass patch and force the encounter instead of waiting for the random roll
+    patch = next(iter(game.encounter_sprites))
+    game.player.rect.center = game.player.hitbox.center = patch.rect.center
+    scripted_input.set(held=('d',))
+    yield
+    game.monster_encounter()
+    if game.transition_target is None:
+        raise RuntimeError('the scripted encounter did not start a battle')
+    # the fade into the battle, the battle and the fade out of it
+    frame = 0
+    while game.battle or game.transition_target is not None:
+        if frame == BATTLE_MAX_FRAMES:
+            raise RuntimeError(f'the scripted battle is still going after {BATTLE_MAX_FRAMES} frames')
+        if game.battle:
+            stats['rounds'] = game.battle.engine.rounds
+        scripted_input.set(tapped=('space',) if frame % BATTLE_CONFIRM_INTERVAL == 0 else ())
+        frame += 1
+        yield
+
+
+SCENARIO = {'walk': walk_route, 'transition': enter_transition, 'battle': fight_battle}
+
+
+def summarize(frames):
+    """Frame time percentiles and the mean time per part of the frame, all in milliseconds."""
+    totals = [frame['frame'] for frame in frames]
+    percentiles = statistics.quantiles(totals, n=100, method='inclusive')
+    summary = {'frames': len(frames), 'mean': statistics.fmean(totals),
+               'p50': percentiles[49], 'p95': percentiles[94], 'p99': percentiles[98], 'max': max(totals)}
+    for part in ('update', 'draw', 'overlay'):
+        summary[part] = statistics.fmean(frame[part] for frame in frames)
+    return summary
+
+
+def bench_game(args):
+    init_display()
+    random.seed(args.seed)
+    from game import Game
+
+    clock = SimulatedClock(args.dt)
+    timer.get_ticks = clock.get_ticks
+    game = Game(lambda *args: None)
+    game.start_up_delay.active = False
+    game.spawn_chance = 101
+    scripted_input = ScriptedInput()
+
+    # time the three parts of run_frame by wrapping them on the instance
+    timings = {}
+    for name, part in (('update', 'update'), ('draw', 'draw'), ('draw_overlays', 'overlay')):
+        def timed(*method_args, method=getattr(game, name), part=part):
+            start = time.perf_counter()
+            result = method(*method_args)
+            timings[part] = (time.perf_counter() - start) * 1000
+            return result
+        setattr(game, name, timed)
+
+    results, all_frames = {}, []
+    for phase, script in SCENARIO.items():
+        frames, stats = [], {'rounds': 0}
+        for _ in script(game, scripted_input, stats):
+            timings.update(update=0, draw=0, overlay=0)
+            clock.tick()
+            start = time.perf_counter()
+            game.run_frame(args.dt / 1000)
+            frames.append({'frame': (time.perf_counter() - start) * 1000, **timings})
+        results[phase] = {**summarize(frames), **stats}
+        all_frames.extend(frames)
+    results['all'] = {**summarize(all_frames), 'rounds': sum(results[phase]['rounds'] for phase in SCENARIO)}
+    timer.get_ticks = pygame.time.get_ticks
+    return results
+
+
+def bench_monsters(args):
+    """A big party of caught monsters: python memory per monster and the getters the ui calls every frame."""
+    from monster import Monster
+
+    names = list(game_data.monster_data)
+
+    def build():
+        rng = random.Random(args.seed)
+        return [Monster(rng.choice(names), rng.randint(1, 50)) for _ in range(args.count)]
+
+    def read():
+        # what MonsterInventory, MonsterStatsSprite, the battle menus and the search ask for
+        for monster in monsters:
+            monster.update()
+            monster.get_stats()
+            monster.get_info()
+            monster.get_abilities()
+            monster.get_stat('speed')
+
+    def level_up():
+        for monster in monsters:
+            monster.update_exp(monster.level_up - monster.exp)
+
+    # the first party also fills what monsters of the same species and level share, the same party again doesn't
+    _, _, first_retained = trace_call(build)
+    monsters, _, retained = trace_call(build)
+    return {'party': {
+        'monsters': args.count,
+        'bytes_each': retained * 1024 / args.count,
+        'shared_kb': first_retained - retained,
+        'create': time_call(build, repeat=args.repeat),
+        'read': time_call(read, repeat=args.repeat),
+        'copy': time_call(lambda: [copy.copy(monster) for monster in monsters], repeat=args.repeat),
+        'level_up': time_call(level_up, repeat=args.repeat),
+    }}
+
+
+def bench_roster(args):
+    """Monsters in storage: python memory per stored monster and the box operations on all of them (ms)."""
+    from monster import Monster
+    from roster import Roster
+
+    rng = random.Random(args.seed)
+    names = list(game_data.monster_data)
+    monsters = [Monster(rng.choice(names), rng.randint(1, 50)) for _ in range(args.count)]
+
+    def build():
+        roster = Roster()
+        for monster in monsters:
+            roster.add(monster)
+        return roster
+
+    roster, _, retained = trace_call(build)
+    data = roster.to_dict()
+    return {'roster': {
+        'monsters': args.count,
+        'bytes_each': retained * 1024 / args.count,
+        'add': time_call(build, repeat=args.repeat),
+        'sort': time_call(roster.sort, 'level', repeat=args.repeat),
+        'filter': time_call(lambda: roster.filter(element='fire', min_level=20), repeat=args.repeat),
+        'save': time_call(lambda: json.dumps(roster.to_dict()), repeat=args.repeat),
+        'load': time_call(lambda: Roster().from_dict(data), repeat=args.repeat),
+        'take': time_call(lambda: [roster.take(0) for _ in range(100)], repeat=1),
+    }}
+
+
+def print_table(results):
+    columns = list(next(iter(results.values())))
+    print(f"{'':14s}" + ''.join(f'{column:>14s}' for column in columns))
+    for name, row in results.items():
+        print(f'{name:14s}' + ''.join(f'{row[column]:14.2f}' if isinstance(row[column], float) else f'{row[column]:14d}'
+                                      for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='rpg-game benchmarks, run from inside code/')
+    parser.add_argument('--json', action='store_true', help='print the results as json')
+    sub_parsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    loaders_parser = sub_parsers.add_parser('loaders', help='support importers: time, allocations and surfaces')
+    loaders_parser.add_argument('--threads', type=int, default=IMAGE_LOADER_THREADS,
+                                help='decode pool of the timed runs, serial_ms always decodes serially')
+    loaders_parser.add_argument('--repeat', type=int, default=5)
+    loaders_parser.set_defaults(run=bench_loaders)
+
+    maps_parser = sub_parsers.add_parser('maps', help='tmx maps through pytmx against the compiled format (ms)')
+    maps_parser.add_argument('--repeat', type=int, default=3)
+    maps_parser.set_defaults(run=bench_maps)
+
+    game_parser = sub_parsers.add_parser('game', help='frame times of a scripted walk, transition and battle (ms)')
+    game_parser.add_argument('--dt', type=float, default=1000 / 60, help='simulated frame time in ms')
+    game_parser.add_argument('--seed', type=int, default=1)
+    game_parser.set_defaults(run=bench_game)
+
+    monsters_parser = sub_parsers.add_parser('monsters', help='a party of caught monsters: bytes each and getters (ms)')
+    monsters_parser.add_argument('--count', type=int, default=500)
+    monsters_parser.add_argument('--repeat', type=int, default=5)
+    monsters_parser.add_argument('--seed', type=int, default=1)
+    monsters_parser.set_defaults(run=bench_monsters)
+
+    roster_parser = sub_parsers.add_parser('roster', help='monster storage: bytes each and box operations (ms)')
+    roster_parser.add_argument('--count', type=int, default=5000)
+    roster_parser.add_argument('--repeat', type=int, default=5)
+    roster_parser.add_argument('--seed', type=int, default=1)
+    roster_parser.set_defaults(run=bench_roster)
+
+    args = parser.parse_args()
+    results = args.run(args)
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
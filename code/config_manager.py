@@ -1,6 +1,6 @@
 import pygame
 
-from tkinter import Tk as tk
+from tkinter import Tk as tk, TclError
 from settings import *
 import json
 import os
@@ -10,12 +10,21 @@ from debug import debug
 class ConfigManager:
     def __init__(self, filepath='../save_data/settings.json'):
         self.filepath = filepath
-        app = tk()
-        width, height = app.winfo_screenwidth(), app.winfo_screenheight()
+        try:
+            app = tk()
+            width, height = app.winfo_screenwidth(), app.winfo_screenheight()
+        except TclError:
+            # no display to ask (headless runs), fall back to a fixed window size
+            width, height = DEFAULT_WINDOW_SIZE
         self.settings = {
             'video': {
                 'window_width': width, 'window_height': height,
-                'fullscreen': True
+                'fullscreen': True,
+                'frame_cap': 60
+            },
+            'simulation': {
+                'fixed_timestep': True,
+                'tick_rate': 60
             },
             'audio': {
                 'music': 0.,
@@ -0,0 +1,61 @@
+from settings import *
+from game_data import game_data
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# elements and attacks interned to small integers, the index into the tables below
+ELEMENTS = tuple(ELEMENT_RELATIONSHIPS)
+ELEMENT_IDS = {element: index for index, element in enumerate(ELEMENTS)}
+ATTACKS = tuple(game_data.attack_data)
+ATTACK_IDS = {attack: index for index, attack in enumerate(ATTACKS)}
+
+# attack id -> element id and damage multiplier of the attack
+ATTACK_ELEMENTS = tuple(ELEMENT_IDS[game_data.attack_data[attack]['element']] for attack in ATTACKS)
+ATTACK_AMOUNTS = tuple(game_data.attack_data[attack]['amount'] for attack in ATTACKS)
+
+
+def get_effectiveness(attack_element, target_element):
+    relationships = ELEMENT_RELATIONSHIPS.get(attack_element, {})
+    multiplier = 1
+    if target_element in relationships.get('vulnerable_to', []):
+        multiplier *= 2
+    if target_element in relationships.get('resistant_to', []):
+        multiplier *= 0.5
+    return multiplier
+
+
+# attack element id x target element id -> damage multiplier
+EFFECTIVENESS = tuple(tuple(get_effectiveness(attack_element, target_element) for target_element in ELEMENTS)
+                      for attack_element in ELEMENTS)
+
+
+def get_damage(amount, attack_element, target_element, defense, defending):
+    """Health the target loses from an attack of amount base damage, elements as ids, negative amounts heal."""
+    amount *= EFFECTIVENESS[attack_element][target_element]
+
+    # get fraction of the damage by targets defense
+    target_defense = 1 - defense / 2000
+    if defending:
+        target_defense -= 0.2
+    target_defense = max(0, min(1, target_defense))
+    return int(amount * target_defense)
+
+
+if numpy:
+    EFFECTIVENESS_ARRAY = numpy.array(EFFECTIVENESS, dtype=numpy.float64)
+
+    def get_damages(amounts, attack_elements, target_elements, defenses, defending):
+        """get_damage for arrays of attacker/target pairs in one call, gives the same numbers as the loop would."""
+        amounts = numpy.asarray(amounts, dtype=numpy.float64) * EFFECTIVENESS_ARRAY[attack_elements, target_elements]
+        target_defense = 1 - numpy.asarray(defenses, dtype=numpy.float64) / 2000
+        target_defense = numpy.where(defending, target_defense - 0.2, target_defense)
+        target_defense = numpy.clip(target_defense, 0, 1)
+        return numpy.trunc(amounts * target_defense).astype(numpy.int64)
+else:
+    def get_damages(amounts, attack_elements, target_elements, defenses, defending):
+        """get_damage for sequences of attacker/target pairs, the fallback without numpy."""
+        return [get_damage(*pair) for pair in zip(amounts, attack_elements, target_elements, defenses, defending)]
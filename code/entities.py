@@ -97,24 +97,27 @@ class Player(Entity):
         initial_centery = self.rect.centery
 
         # horizontal movement
+        initial_hitbox = self.hitbox.copy()
         self.rect.centerx += self.direction.x * self.speed * dt
         self.hitbox.centerx = self.rect.centerx
-        if self.check_collision('horizontal'):
+        if self.check_collision('horizontal', self.hitbox.union(initial_hitbox)):
             self.rect.centerx = initial_centerx
             self.hitbox.centerx = initial_centerx
 
         # vertical movement
+        initial_hitbox = self.hitbox.copy()
         self.rect.centery += self.direction.y * self.speed * dt
         self.hitbox.centery = self.rect.centery + self.hitbox_offset_y
-        if self.check_collision('vertical'):
+        if self.check_collision('vertical', self.hitbox.union(initial_hitbox)):
             self.rect.centery = initial_centery
             self.hitbox.centery = initial_centery + self.hitbox_offset_y
 
         self.y_sort = self.rect.centery
 
-    def check_collision(self, axis):
+    def check_collision(self, axis, swept_hitbox):
+        # only the sprites in the grid cells covered by this frame's movement can be hit
         collided = False
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.query(swept_hitbox):
             if sprite.hitbox.colliderect(self.hitbox):
                 collided = True
                 if axis == 'horizontal':
@@ -143,6 +146,7 @@ class Player(Entity):
     def from_dict(self, data):
         self.rect.center = data['pos']
         self.hitbox.center = self.rect.center + vector(0, self.hitbox_offset_y)
+        self.y_sort = self.rect.centery
         self.hitbox.center = self.rect.center
         self.facing_direction = data['facing_direction']
         self.speed = data['speed']
@@ -158,12 +162,13 @@ class Player(Entity):
 
 class Characters(Entity):
     def __init__(self, pos, frames, groups, facing_direction, character_data, player, create_dialogue,
-                 collision_sprites, radius, char_id, sounds):
+                 occupancy_grid, character_sprites, radius, char_id, sounds):
         super().__init__(pos, frames, groups, facing_direction)
         self.character_data = character_data
         self.player = player
         self.create_dialogue = create_dialogue
-        self.collision_rects = [sprite.rect for sprite in collision_sprites if sprite is not self]
+        self.occupancy_grid = occupancy_grid
+        self.character_sprites = character_sprites
         self.char_id = char_id
         self.monsters = {i: Monster(name, lvl) for i, (name, lvl) in character_data['monsters'].items()}\
             if 'monsters' in character_data else None
@@ -204,9 +209,10 @@ class Characters(Entity):
 
     def has_los(self):
         if vector(self.rect.center).distance_to(self.player.rect.center) < self.radius:
-            collisions = [bool(rect.clipline(self.rect.center, self.player.rect.center)) for rect in
-                          self.collision_rects]
-            return not any(collisions)
+            start, end = self.rect.center, self.player.rect.center
+            # other characters stand in the way too, they move so they are checked here and not in the grid
+            return self.occupancy_grid.has_los(start, end) and not any(
+                character.rect.clipline(start, end) for character in self.character_sprites if character is not self)
 
     def start_move(self):
         relation = (vector(self.player.rect.center) - vector(self.rect.center)).normalize()
@@ -217,6 +223,7 @@ class Characters(Entity):
             if not self.hitbox.inflate(10, 10).colliderect(self.player.hitbox):
                 self.rect.center += self.direction * self.speed * dt
                 self.hitbox.center = self.rect.center + vector(0, self.hitbox_offset_y)
+                self.y_sort = self.rect.centery
             else:
                 self.direction = vector()
                 self.has_moved = True
@@ -238,6 +245,7 @@ class Characters(Entity):
     def from_dict(self, data):
         self.rect.center = data['pos']
         self.hitbox.center = self.rect.center + vector(0, self.hitbox_offset_y)
+        self.y_sort = self.rect.centery
         self.facing_direction = data['facing_direction']
 
         # Convert character_data keys to integers
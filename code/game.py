@@ -5,24 +5,31 @@ import pygame.display
 from settings import *
 from config_manager import config_manager
 from save_manager import save_manager
+from asset_cache import asset_cache
+from atlas import TextureAtlas
+from map_registry import MapRegistry
+from battle_frames import BattleFrames
 from random import randint, uniform
+from collections import OrderedDict
 
 from support import *
 from game_data import game_data
 from timer import Timer
 
-from sprites import Sprite, AnimatedSprite, MonsterPatchSprite, BorderSprite, CollidableSprite, TransitionSprite
+from sprites import Sprite, SharedAnimatedSprite, MonsterPatchSprite, BorderSprite, CollidableSprite, TransitionSprite
 from entities import Player, Characters
-from groups import AllSprites
+from world import World
+from occupancy_grid import OccupancyGrid
 from monster import Monster
 from monster_inventory import MonsterInventory
+from roster import Roster
 from battle import Battle
 from evolution import Evolution
 from options import Options
 
 from dialogue import DialogueTree
 
-from debug import debug
+from profiler import profiler
 
 
 class Game:
@@ -30,6 +37,7 @@ class Game:
     def __init__(self, open_main_menu, save_data=None):
         self.display_surface = pygame.display.get_surface()
         self.clock = pygame.time.Clock()
+        self.step_accumulator = 0
 
         # player monsters
         self.player_monsters = {
@@ -37,13 +45,12 @@ class Game:
             1: Monster('Sparchu', 5),
             2: Monster('Finsta', 5),
         }
+        # caught monsters beyond PARTY_SIZE
+        self.monster_storage = Roster()
 
-        # groups
-        self.collision_sprites = pygame.sprite.Group()
-        self.all_sprites = AllSprites(self.collision_sprites)
-        self.character_sprites = pygame.sprite.Group()
-        self.transition_sprites = pygame.sprite.Group()
-        self.encounter_sprites = pygame.sprite.Group()
+        # worlds, the sprite groups of recently visited maps
+        self.worlds = OrderedDict()
+        self.world = None
 
         # transition / tint
         self.transition_target = None
@@ -57,12 +64,13 @@ class Game:
         # setup
         self.current_world = 'world'
         self.import_assets()
-        self.setup(self.tmx_maps[self.current_world], 'start')
+        self.enter_world(self.current_world, 'start')
         self.audio['music_overworld'].play(loops=-1, fade_ms=1000)
 
         # overlays
         self.dialogue_tree = None
-        self.monster_index = MonsterInventory(self.player_monsters, self.fonts, self.monster_frames)
+        self.monster_index = MonsterInventory(self.player_monsters, self.monster_storage, self.fonts,
+                                              self.monster_frames)
         self.monster_index_open = False
         self.battle = None
 
@@ -93,25 +101,12 @@ class Game:
         self.start_up_delay = Timer(250, autostart=True)
 
     def import_assets(self):
-        self.tmx_maps = import_tmx_maps('..', 'data', 'maps')
+        self.tmx_maps = MapRegistry('..', 'data', 'maps')
 
-        self.overworld_frames = {
-            'water': import_folder('..', 'graphics', 'tilesets', 'water'),
-            'coast': import_coastline(24, 12, '..', 'graphics', 'tilesets', 'coast'),
-            'characters': import_all_characters('..', 'graphics', 'characters')
-        }
-
-        self.monster_frames = {
-            'icons': import_folder_dict('..', 'graphics', 'icons'),
-            'monsters': import_monster(4, 2, '..', 'graphics', 'monsters'),
-            'attacks': import_attacks('..', 'graphics', 'attacks'),
-            'ui': import_folder_dict('..', 'graphics', 'ui')
-        }
-        self.monster_frames['outlines'] = outline_creator(self.monster_frames['monsters'], 4)
-
-        self.bg_frames = import_folder_dict('..', 'graphics', 'backgrounds')
-
-        self.star_animation_frames = import_folder('..', 'graphics', 'other', 'star animation')
+        # sliced and outlined frames come from the asset cache unless something in graphics changed
+        self.overworld_frames, self.monster_frames, self.bg_frames, self.star_animation_frames = \
+            asset_cache.load('frames', self.import_frames, join('..', 'graphics'))
+        self.battle_frames = BattleFrames(self.monster_frames)
 
         screen_width, _ = self.display_surface.get_size()
         font_size_ratio = 0.015
@@ -127,28 +122,90 @@ class Game:
         self.adjust_volume('music')
         self.adjust_volume('sfx')
 
+    @staticmethod
+    def import_frames():
+        overworld_frames = {
+            'water': import_folder('..', 'graphics', 'tilesets', 'water'),
+            'coast': import_coastline(24, 12, '..', 'graphics', 'tilesets', 'coast'),
+            'characters': import_all_characters('..', 'graphics', 'characters')
+        }
+
+        monster_frames = {
+            'icons': import_folder_dict('..', 'graphics', 'icons'),
+            'monsters': import_monster(4, 2, '..', 'graphics', 'monsters'),
+            'attacks': import_attacks('..', 'graphics', 'attacks'),
+            'ui': import_folder_dict('..', 'graphics', 'ui')
+        }
+        monster_frames['outlines'] = outline_creator(monster_frames['monsters'], 4)
+        monster_frames = TextureAtlas().pack(monster_frames)
+
+        bg_frames = import_folder_dict('..', 'graphics', 'backgrounds')
+
+        star_animation_frames = import_folder('..', 'graphics', 'other', 'star animation')
+
+        return overworld_frames, monster_frames, bg_frames, star_animation_frames
+
+    def enter_world(self, name, player_start_pos):
+        """Resume the world of a visited map or build it, then place the player at the start position."""
+        if self.world:
+            self.player.kill()
+        if name in self.worlds:
+            self.worlds.move_to_end(name)
+            self.activate_world(self.worlds[name])
+            self.create_player(player_start_pos)
+        else:
+            self.setup(self.tmx_maps[name], player_start_pos)
+            self.worlds[name] = self.world
+            while len(self.worlds) > WORLD_CACHE_SIZE:
+                self.worlds.popitem(last=False)
+        self.current_world = name
+
+    def activate_world(self, world):
+        self.world = world
+        self.collision_sprites = world.collision_sprites
+        self.all_sprites = world.all_sprites
+        self.character_sprites = world.character_sprites
+        self.transition_sprites = world.transition_sprites
+        self.encounter_sprites = world.encounter_sprites
+        self.occupancy_grid = world.occupancy_grid
+
+    def create_player(self, player_start_pos):
+        if isinstance(player_start_pos, str) and player_start_pos in self.world.player_starts:
+            pos, facing_direction = self.world.player_starts[player_start_pos]
+        else:
+            # a saved position instead of a named spawn point
+            pos, facing_direction = player_start_pos, 'down'
+        self.player = Player(
+            pos=pos,
+            frames=self.overworld_frames['characters']['player'],
+            groups=self.all_sprites,
+            facing_direction=facing_direction,
+            collision_sprites=self.collision_sprites
+        )
+        for character in self.character_sprites:
+            character.player = self.player
+
     def setup(self, tmx_map, player_start_pos):
-        # clear the map
-        for group in (self.collision_sprites, self.all_sprites, self.character_sprites, self.transition_sprites):
-            group.empty()
+        self.activate_world(World())
 
         # terrain
         for layer in ['Terrain', 'Terrain Top']:
             for x, y, surf in tmx_map.get_layer_by_name(layer).tiles():
-                Sprite((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites, WORLD_LAYERS['bg'])
+                self.all_sprites.terrain_chunks.add((x * TILE_SIZE, y * TILE_SIZE), surf)
 
         # water
         for obj in tmx_map.get_layer_by_name('Water'):
             for x in range(int(obj.x), int(obj.x + obj.width), TILE_SIZE):
                 for y in range(int(obj.y), int(obj.y + obj.height), TILE_SIZE):
-                    AnimatedSprite((x, y), self.overworld_frames['water'], self.all_sprites, WORLD_LAYERS['water'])
+                    SharedAnimatedSprite((x, y), self.overworld_frames['water'], self.all_sprites.animation_clock,
+                                         self.all_sprites, WORLD_LAYERS['water'])
 
         # coast
         for obj in tmx_map.get_layer_by_name('Coast'):
             terrain = obj.properties['terrain']
             side = obj.properties['side']
-            AnimatedSprite((obj.x, obj.y), self.overworld_frames['coast'][terrain][side], self.all_sprites,
-                           WORLD_LAYERS['bg'])
+            SharedAnimatedSprite((obj.x, obj.y), self.overworld_frames['coast'][terrain][side],
+                                 self.all_sprites.animation_clock, self.all_sprites, WORLD_LAYERS['bg'])
 
         # grass patches
         for obj in tmx_map.get_layer_by_name('Monsters'):
@@ -156,16 +213,22 @@ class Game:
                                obj.properties['biome'], obj.properties['min_level'], obj.properties['max_level'],
                                obj.properties['monsters'])
 
+        # line of sight grid
+        self.occupancy_grid = self.world.occupancy_grid = OccupancyGrid(tmx_map.width * TILE_SIZE,
+                                                                         tmx_map.height * TILE_SIZE)
+
         # collision objects
         for obj in tmx_map.get_layer_by_name('Collisions'):
-            BorderSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
+            sprite = BorderSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
+            self.occupancy_grid.block(sprite.rect)
 
         # objects
         for obj in tmx_map.get_layer_by_name('Objects'):
             if obj.name == 'top':
                 Sprite((obj.x, obj.y), obj.image, self.all_sprites, WORLD_LAYERS['top'])
             else:
-                CollidableSprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
+                sprite = CollidableSprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
+                self.occupancy_grid.block(sprite.rect)
 
         # transition objects
         for obj in tmx_map.get_layer_by_name('Transition'):
@@ -173,18 +236,10 @@ class Game:
                              self.transition_sprites)
 
         # entities
-        player_created = False
         for obj in tmx_map.get_layer_by_name('Entities'):
             if obj.name == 'Player':
-                if obj.properties['pos'] == player_start_pos:
-                    self.player = Player(
-                        pos=(obj.x, obj.y),
-                        frames=self.overworld_frames['characters']['player'],
-                        groups=self.all_sprites,
-                        facing_direction=obj.properties['direction'],
-                        collision_sprites=self.collision_sprites
-                    )
-                    player_created = True
+                self.world.player_starts[obj.properties['pos']] = ((obj.x, obj.y), obj.properties['direction'])
+        self.create_player(player_start_pos)
         for obj in tmx_map.get_layer_by_name('Entities'):
             if obj.name != 'Player':
                 Characters(
@@ -195,21 +250,15 @@ class Game:
                     character_data=game_data.character_data[obj.properties['character_id']],
                     player=self.player,
                     create_dialogue=self.create_dialogue,
-                    collision_sprites=self.collision_sprites,
+                    occupancy_grid=self.occupancy_grid,
+                    character_sprites=self.character_sprites,
                     radius=obj.properties['radius'],
                     char_id=obj.properties['character_id'],
                     sounds=self.audio
                 )
 
-        if not player_created:
-            # Create the player at the start position if not already created
-            self.player = Player(
-                pos=player_start_pos,
-                frames=self.overworld_frames['characters']['player'],
-                groups=self.all_sprites,
-                facing_direction='down',  # Default facing direction
-                collision_sprites=self.collision_sprites
-            )
+        # build the collision grid now instead of on the first movement
+        self.collision_sprites.index_pending()
 
     # dialogue system
     def input(self):
@@ -251,6 +300,7 @@ class Game:
             for monster in self.player_monsters.values():
                 monster.health = monster.get_stat('max_health')
                 monster.energy = monster.get_stat('max_energy')
+            self.monster_storage.heal()
             self.player.unblock()
         elif not character.character_data['defeated']:
             self.audio['music_overworld'].fadeout(1000)
@@ -260,6 +310,7 @@ class Game:
                 player_monsters=self.player_monsters,
                 opponent_monsters=character.monsters,
                 monster_frames=self.monster_frames,
+                battle_frames=self.battle_frames,
                 bg_surf=self.bg_frames[character.character_data['biome']],
                 fonts=self.fonts,
                 end_battle=self.end_battle,
@@ -274,8 +325,7 @@ class Game:
 
     # battle encounters
     def check_for_monster(self):
-        if [sprite for sprite in self.encounter_sprites if sprite.rect.colliderect(self.player.hitbox)]\
-                and not self.battle and self.player.direction:
+        if self.encounter_sprites.query(self.player.hitbox) and not self.battle and self.player.direction:
             if not self.encounter_timer.active:
                 self.encounter_timer.activate()
                 x = randint(0, 100)
@@ -285,7 +335,7 @@ class Game:
             self.encounter_timer.deactivate()
 
     def monster_encounter(self):
-        sprites = [sprite for sprite in self.encounter_sprites if sprite.rect.colliderect(self.player.hitbox)]
+        sprites = self.encounter_sprites.query(self.player.hitbox)
         if sprites and self.player.direction:
             # block player
             self.player.block()
@@ -307,6 +357,7 @@ class Game:
                 player_monsters=self.player_monsters,
                 opponent_monsters=wild_monsters,
                 monster_frames=self.monster_frames,
+                battle_frames=self.battle_frames,
                 bg_surf=self.bg_frames[sprites[0].biome],
                 fonts=self.fonts,
                 end_battle=self.end_battle,
@@ -322,6 +373,7 @@ class Game:
 
         self.transition_target = 'level'
         self.tint_mode = 'tint'
+        self.store_monsters()
         if character:
             character.character_data['defeated'] = True
             # game_data.character_data[character]
@@ -329,9 +381,24 @@ class Game:
         elif not self.evolution:
             self.player.unblock()
 
+    def store_monsters(self):
+        # monsters caught with a full party go to storage, the party stays numbered from 0
+        for index in sorted(self.player_monsters)[PARTY_SIZE:]:
+            monster = self.player_monsters.pop(index)
+            # evolutions in storage happen right away, without the animation
+            while monster.evolution and monster.level >= monster.evolution[1]:
+                monster = Monster(monster.evolution[0], monster.level)
+            self.monster_storage.add(monster)
+
     # transition system
     def transition_check(self):
-        sprites = [sprite for sprite in self.transition_sprites if sprite.rect.colliderect(self.player.hitbox)]
+        # start loading the maps behind nearby transitions, so the fade doesn't have to wait for them
+        prefetch_area = self.player.hitbox.inflate(TRANSITION_PREFETCH_DISTANCE * 2, TRANSITION_PREFETCH_DISTANCE * 2)
+        for sprite in self.transition_sprites.query(prefetch_area):
+            if sprite.target[0] not in self.worlds:
+                self.tmx_maps.prefetch(sprite.target[0])
+
+        sprites = self.transition_sprites.query(self.player.hitbox)
         if sprites:
             self.player.block()
             self.transition_target = sprites[0].target
@@ -349,8 +416,7 @@ class Game:
                 elif self.transition_target == 'level':
                     self.battle = None
                 else:
-                    self.setup(self.tmx_maps[self.transition_target[0]], self.transition_target[1])
-                    self.current_world = self.transition_target[0]
+                    self.enter_world(*self.transition_target)
                 self.tint_mode = 'untint'
                 self.transition_target = None
 
@@ -360,6 +426,8 @@ class Game:
 
     # evolutions
     def check_evolution(self):
+        # the party is settled first, so a queued evolution never lands on a monster that went to storage
+        self.store_monsters()
         for index, monster in self.player_monsters.items():
             if monster.evolution:
                 if monster.level >= monster.evolution[1]:
@@ -399,6 +467,7 @@ class Game:
         self.tint_surf = pygame.transform.scale(self.tint_surf, (config_manager.settings['video']['window_width'],
                                                                  config_manager.settings['video']['window_height']))
         self.monster_index.adjust_surfaces()
+        self.battle_frames.clear()
 
     def adjust_fonts(self):
         screen_width, _ = self.display_surface.get_size()
@@ -421,7 +490,8 @@ class Game:
     def to_dict(self):
         return {
             'current_world': self.current_world,
-            'player_monsters': [monster.to_dict() for monster in self.player_monsters.values()]
+            'player_monsters': [monster.to_dict() for monster in self.player_monsters.values()],
+            'monster_storage': self.monster_storage.to_dict()
         }
 
     def from_dict(self, data):
@@ -450,20 +520,48 @@ class Game:
                             monster = Monster(monster_data['name'], monster_data['level'])
                             monster.from_dict(monster_data)
                             self.player_monsters[i] = monster
+                    self.monster_storage = Roster()
+                    if 'monster_storage' in save_data['game_data']:
+                        self.monster_storage.from_dict(save_data['game_data']['monster_storage'])
                 if 'character_data' in save_data:
                     game_data.from_dict(save_data['character_data'])
 
                 if 'player' in save_data:
-                    # Set up the game with the loaded tmx_map
-                    self.setup(self.tmx_maps[self.current_world], save_data['player']['pos'])
+                    # Set up the game with the loaded tmx_map, the saved characters replace any visited world
+                    self.worlds.clear()
+                    self.enter_world(self.current_world, save_data['player']['pos'])
 
                     self.player.from_dict(save_data['player'])
                 if 'characters' in save_data:
                     for char_data, character in zip(save_data['characters'], self.character_sprites):
                         character.from_dict(char_data)
-            self.monster_index = MonsterInventory(self.player_monsters, self.fonts, self.monster_frames)
+            self.monster_index = MonsterInventory(self.player_monsters, self.monster_storage, self.fonts,
+                                                  self.monster_frames)
 
     # run function
+    def update_world(self, dt):
+        """Advance the overworld in fixed steps and return how far into the next step the frame is drawn."""
+        if not config_manager.settings['simulation']['fixed_timestep']:
+            self.step_world(dt)
+            return 1
+
+        step = 1 / config_manager.settings['simulation']['tick_rate']
+        # after a long stall the world skips ahead instead of catching up on every missed step
+        self.step_accumulator = min(self.step_accumulator + dt, step * MAX_SIMULATION_STEPS)
+        while self.step_accumulator >= step:
+            self.step_world(step)
+            self.step_accumulator -= step
+        return self.step_accumulator / step
+
+    def step_world(self, dt):
+        self.encounter_timer.update()
+        with profiler.scope('transition_check'):
+            self.transition_check()
+        with profiler.scope('sprites.update'):
+            self.all_sprites.update(dt)
+        with profiler.scope('check_for_monster'):
+            self.check_for_monster()
+
     def show_loading_screen(self):
         loading_font = pygame.font.Font(None, 74)
         loading_text = loading_font.render('Loading...', True, (255, 255, 255))
@@ -472,45 +570,62 @@ class Game:
                                    self.display_surface.get_height() // 2 - loading_text.get_height() // 2))
         pygame.display.flip()
 
+    def update(self, dt):
+        with profiler.scope('input'):
+            if not self.player.blocked or self.monster_index_open:
+                self.input()
+        return self.update_world(dt)
+
+    def draw(self, interpolation):
+        with profiler.scope('sprites.draw'):
+            self.all_sprites.draw(self.player, interpolation)
+        profiler.count('sprites', len(self.all_sprites))
+        profiler.count('sprites drawn', self.all_sprites.drawn_count)
+        profiler.count('collision sprites', len(self.collision_sprites))
+
+    def draw_overlays(self, dt):
+        # the battle stacks between the menus and the evolution, its time is kept apart
+        with profiler.scope('overlays'):
+            if self.dialogue_tree:          self.dialogue_tree.update(self.evolution)
+            if self.monster_index_open:     self.monster_index.update(dt)
+        if self.battle:
+            with profiler.scope('battle'):
+                self.battle.update(dt)
+        with profiler.scope('overlays'):
+            if self.evolution:              self.evolution.update(dt)
+            if self.options_open:           self.options.run()
+
+            self.tint_screen(dt)
+
+    def run_frame(self, dt):
+        profiler.start_frame()
+        self.display_surface.fill('black')
+
+        # event loop
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                exit()
+            if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+                profiler.toggle()
+
+        # update
+        if self.start_up_delay.active:
+            self.start_up_delay.update()
+
+        if not self.start_up_delay.active:
+            interpolation = self.update(dt)
+            self.draw(interpolation)
+            self.draw_overlays(dt)
+
+        profiler.draw(self.display_surface)
+
+        pygame.display.flip()
+        profiler.end_frame()
+
     def run(self):
         while self.running:
-            dt = self.clock.tick() / 1000
-            self.display_surface.fill('black')
-
-            # event loop
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-
-            # update
-            if self.start_up_delay.active:
-                self.start_up_delay.update()
-
-            if not self.start_up_delay.active:
-                self.encounter_timer.update()
-                if not self.player.blocked or self.monster_index_open:
-                    self.input()
-                self.transition_check()
-                self.all_sprites.update(dt)
-                self.check_for_monster()
-
-                # drawing
-                self.all_sprites.draw(self.player)
-
-                # overlays
-                if self.dialogue_tree:          self.dialogue_tree.update(self.evolution)
-                if self.monster_index_open:     self.monster_index.update(dt)
-                if self.battle:                 self.battle.update(dt)
-                if self.evolution:              self.evolution.update(dt)
-                if self.options_open:           self.options.run()
-
-                self.tint_screen(dt)
-
-            debug_str = ''
-            debug(debug_str)
-
-            pygame.display.flip()
+            self.run_frame(self.clock.tick(config_manager.settings['video']['frame_cap']) / 1000)
 
         for audio in self.audio.values():
             audio.fadeout(500)
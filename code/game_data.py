@@ -12,7 +12,8 @@ class GameData:
                 'directions': ['down'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'easy'
             },
             'o2': {
                 'monsters': {0: ('Atrox', 14), 1: ('Pouch', 15), 2: ('Draem', 13), 3: ('Cindrill', 13)},
@@ -22,7 +23,8 @@ class GameData:
                 'directions': ['left', 'down'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'o3': {
                 'monsters': {0: ('Atrox', 14), 1: ('Pouch', 15), 2: ('Draem', 13), 3: ('Cindrill', 13)},
@@ -32,7 +34,8 @@ class GameData:
                 'directions': ['left', 'right', 'up', 'down'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'o4': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -42,7 +45,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'o5': {
                 'monsters': {0: ('Plumette', 20), 1: ('Ivieron', 22), 2: ('Atrox', 24), 3: ('Pouch', 19)},
@@ -52,7 +56,8 @@ class GameData:
                 'directions': ['up', 'right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'o6': {
                 'monsters': {0: ('Finsta', 15), 1: ('Finsta', 15), 2: ('Finsta', 15)},
@@ -62,7 +67,8 @@ class GameData:
                 'directions': ['down'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'o7': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -72,7 +78,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'p1': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -82,7 +89,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'p2': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -92,7 +100,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'p3': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -102,7 +111,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'p4': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -112,7 +122,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'normal'
             },
             'px': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Atrox', 24), 3: ('Finiette', 30)},
@@ -122,7 +133,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'forest'
+                'biome': 'forest',
+                'difficulty': 'hard'
             },
             'w1': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -132,7 +144,8 @@ class GameData:
                 'directions': ['left'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'w2': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -142,7 +155,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'w3': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -152,7 +166,8 @@ class GameData:
                 'directions': ['left'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'w4': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -162,7 +177,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'w5': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -172,7 +188,8 @@ class GameData:
                 'directions': ['left'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'normal'
             },
             'wx': {
                 'monsters': {0: ('Friolera', 25), 1: ('Gulfin', 20), 2: ('Draem', 24), 3: ('Finiette', 30)},
@@ -182,7 +199,8 @@ class GameData:
                 'directions': ['down'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'ice'
+                'biome': 'ice',
+                'difficulty': 'hard'
             },
             'f1': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -192,7 +210,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'f2': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -202,7 +221,8 @@ class GameData:
                 'directions': ['right', 'left'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'f3': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -212,7 +232,8 @@ class GameData:
                 'directions': ['right', 'left'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'f4': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -222,7 +243,8 @@ class GameData:
                 'directions': ['up', 'right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'f5': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -232,7 +254,8 @@ class GameData:
                 'directions': ['left'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'f6': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -242,7 +265,8 @@ class GameData:
                 'directions': ['right'],
                 'look_around': True,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'normal'
             },
             'fx': {
                 'monsters': {0: ('Cindrill', 15), 1: ('Jacana', 20), 2: ('Draem', 24), 3: ('Atrox', 30)},
@@ -252,7 +276,8 @@ class GameData:
                 'directions': ['down'],
                 'look_around': False,
                 'defeated': False,
-                'biome': 'sand'
+                'biome': 'sand',
+                'difficulty': 'hard'
             },
             'Nurse': {
                 'direction': 'down',
@@ -1,58 +1,351 @@
 from settings import *
 from config_manager import config_manager
+from math import floor, inf
+from bisect import bisect_left, bisect_right
 from support import import_image
+from sprites import AnimationClock
 from entities import Entity
 
 
-class AllSprites(pygame.sprite.Group):
+class TerrainChunks:
+    def __init__(self, chunk_size=TERRAIN_CHUNK_SIZE):
+        self.chunk_size = chunk_size * TILE_SIZE
+        self.tiles = {}
+        self.surfaces = {}
+
+    def add(self, pos, surf):
+        key = (int(pos[0] // self.chunk_size), int(pos[1] // self.chunk_size))
+        local_pos = (pos[0] - key[0] * self.chunk_size, pos[1] - key[1] * self.chunk_size)
+        self.tiles.setdefault(key, []).append((surf, local_pos))
+        self.surfaces.pop(key, None)
+
+    def empty(self):
+        self.tiles.clear()
+        self.surfaces.clear()
+
+    def bake(self, key):
+        # chunks are drawn first onto the black screen fill, so an opaque surface is fine
+        surf = pygame.Surface((self.chunk_size, self.chunk_size)).convert()
+        surf.fblits(self.tiles[key])
+        return surf
+
+    def get_surface(self, key):
+        # most recently used chunks are kept at the end of the dict
+        surf = self.surfaces.pop(key, None)
+        if surf is None:
+            surf = self.bake(key)
+        self.surfaces[key] = surf
+        return surf
+
+    def draw(self, surface, visible_area, offset):
+        left = int(visible_area.left // self.chunk_size)
+        right = int((visible_area.right - 1) // self.chunk_size)
+        top = int(visible_area.top // self.chunk_size)
+        bottom = int((visible_area.bottom - 1) // self.chunk_size)
+
+        # floor the offset so chunk edges line up with where single tiles used to be blitted
+        offset_x, offset_y = floor(offset.x), floor(offset.y)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                if (x, y) in self.tiles:
+                    surface.blit(self.get_surface((x, y)),
+                                 (x * self.chunk_size + offset_x, y * self.chunk_size + offset_y))
+
+        # only keep enough baked chunks for the viewport and a ring around it
+        max_surfaces = (right - left + 3) * (bottom - top + 3)
+        while len(self.surfaces) > max_surfaces:
+            del self.surfaces[next(iter(self.surfaces))]
+
+
+class SpatialHash:
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE, rect_attr='rect'):
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr
+        self.cells = {}
+        self.sprite_cells = {}
+        self.order = {}
+        self.counter = 0
+
+    def get_cell_range(self, rect):
+        return (int(rect.left // self.cell_size), int(rect.top // self.cell_size),
+                int(rect.right // self.cell_size), int(rect.bottom // self.cell_size))
+
+    @staticmethod
+    def iter_cells(cell_range):
+        left, top, right, bottom = cell_range
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                yield x, y
+
+    def insert(self, sprite):
+        self.order[sprite] = self.counter
+        self.counter += 1
+        self.place(sprite)
+
+    def place(self, sprite):
+        cell_range = self.get_cell_range(getattr(sprite, self.rect_attr))
+        self.sprite_cells[sprite] = cell_range
+        for cell in self.iter_cells(cell_range):
+            self.cells.setdefault(cell, set()).add(sprite)
+
+    def unplace(self, sprite):
+        for cell in self.iter_cells(self.sprite_cells.pop(sprite)):
+            self.cells[cell].discard(sprite)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def remove(self, sprite):
+        if sprite in self.sprite_cells:
+            self.unplace(sprite)
+            del self.order[sprite]
+
+    def refresh(self, sprite):
+        # the insertion order is kept, so a moved sprite keeps its draw order
+        if sprite in self.sprite_cells \
+                and self.get_cell_range(getattr(sprite, self.rect_attr)) != self.sprite_cells[sprite]:
+            self.unplace(sprite)
+            self.place(sprite)
+
+    def query(self, rect):
+        found = set()
+        for cell in self.iter_cells(self.get_cell_range(rect)):
+            if cell in self.cells:
+                found.update(self.cells[cell])
+        sprites = [sprite for sprite in found if getattr(sprite, self.rect_attr).colliderect(rect)]
+        sprites.sort(key=self.order.__getitem__)
+        return sprites
+
+    def clear(self):
+        self.cells.clear()
+        self.sprite_cells.clear()
+        self.order.clear()
+        self.counter = 0
+
+
+class YSortedLayer:
+    def __init__(self):
+        self.keys = []
+        self.sprites = []
+        self.sprite_keys = {}
+        self.counter = 0
+        # how far a sprite's rect can reach above or below its y_sort
+        self.extent = 0
+
+    def add(self, *sprites):
+        for sprite in sprites:
+            self.sprite_keys[sprite] = (sprite.y_sort, self.counter)
+            self.counter += 1
+            self.extent = max(self.extent, sprite.y_sort - sprite.rect.top, sprite.rect.bottom - sprite.y_sort)
+        # new sprites are merged in with a single sort, so a freshly loaded map is sorted only once
+        entries = sorted(zip(self.keys + [self.sprite_keys[sprite] for sprite in sprites],
+                             self.sprites + list(sprites)), key=lambda entry: entry[0])
+        self.keys = [key for key, _ in entries]
+        self.sprites = [sprite for _, sprite in entries]
+
+    def remove(self, sprite):
+        if sprite in self.sprite_keys:
+            index = bisect_left(self.keys, self.sprite_keys.pop(sprite))
+            del self.keys[index]
+            del self.sprites[index]
+
+    def refresh(self, sprite):
+        # a moving sprite can change its rect without its y_sort, query has to reach it either way
+        self.extent = max(self.extent, sprite.y_sort - sprite.rect.top, sprite.rect.bottom - sprite.y_sort)
+        y_sort, order = self.sprite_keys[sprite]
+        if sprite.y_sort != y_sort:
+            index = bisect_left(self.keys, (y_sort, order))
+            del self.keys[index]
+            del self.sprites[index]
+            key = (sprite.y_sort, order)
+            index = bisect_right(self.keys, key)
+            self.keys.insert(index, key)
+            self.sprites.insert(index, sprite)
+            self.sprite_keys[sprite] = key
+
+    def query(self, rect):
+        """Return the sprites colliding with rect, already sorted by y_sort."""
+        start = bisect_left(self.keys, (rect.top - self.extent, ))
+        end = bisect_right(self.keys, (rect.bottom + self.extent, inf))
+        return [sprite for sprite in self.sprites[start:end] if sprite.rect.colliderect(rect)]
+
+    def clear(self):
+        self.keys.clear()
+        self.sprites.clear()
+        self.sprite_keys.clear()
+        self.counter = 0
+        self.extent = 0
+
+
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, *sprites, cell_size=SPATIAL_HASH_CELL_SIZE, rect_attr='rect'):
+        self.spatial_hash = SpatialHash(cell_size, rect_attr)
+        # sprites join their groups before they set their rect, so they get indexed on the next query
+        self.pending_sprites = {}
+        self.moving_sprites = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.pending_sprites[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.pending_sprites.pop(sprite, None)
+        self.moving_sprites.pop(sprite, None)
+        self.spatial_hash.remove(sprite)
+
+    def index_pending(self):
+        for sprite in self.pending_sprites:
+            self.spatial_hash.insert(sprite)
+        self.pending_sprites.clear()
+
+    def query(self, rect):
+        """Return the sprites colliding with rect, in the order they were added."""
+        self.index_pending()
+        return self.spatial_hash.query(rect)
+
+    def refresh_moving(self):
+        self.index_pending()
+        for sprite in self.moving_sprites:
+            self.spatial_hash.refresh(sprite)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.refresh_moving()
+
+
+class CollisionSprites(SpatialGroup):
+    def __init__(self, *sprites):
+        self.dynamic_sprites = {}
+        super().__init__(*sprites, cell_size=TILE_SIZE, rect_attr='hitbox')
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.dynamic_sprites.pop(sprite, None)
+
+    def index_pending(self):
+        # entities can move, so they stay in a small overlay that is checked on every query
+        for sprite in self.pending_sprites:
+            if isinstance(sprite, Entity):
+                self.dynamic_sprites[sprite] = None
+            else:
+                self.spatial_hash.insert(sprite)
+        self.pending_sprites.clear()
+
+    def query(self, rect):
+        """Return the static sprites whose hitbox collides with rect, followed by the colliding entities."""
+        return super().query(rect) + [sprite for sprite in self.dynamic_sprites if sprite.hitbox.colliderect(rect)]
+
+
+class AllSprites(SpatialGroup):
     def __init__(self, collision_sprites):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = vector()
+        self.drawn_count = 0
         self.shadow_surf = import_image('..', 'graphics', 'other', 'shadow')
         self.notice_surf = import_image('..', 'graphics', 'ui', 'notice')
         self.collision_sprites = collision_sprites
+        self.terrain_chunks = TerrainChunks()
+        self.main_layer = YSortedLayer()
+        self.animation_clock = AnimationClock()
+        # sprites that actually do something in update, static sprites are skipped
+        self.updating_sprites = {}
+        # where the moving sprites were before the last update, drawing interpolates from there
+        self.previous_positions = {}
 
-    def draw(self, player):
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if isinstance(sprite, Entity):
+            self.moving_sprites[sprite] = None
+        if type(sprite).update is not pygame.sprite.Sprite.update:
+            self.updating_sprites[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.updating_sprites.pop(sprite, None)
+        self.main_layer.remove(sprite)
+
+    def index_pending(self):
+        if not self.pending_sprites:
+            return
+        # the main layer is kept sorted by y_sort instead of going into the spatial hash
+        self.main_layer.add(*[sprite for sprite in self.pending_sprites if sprite.z == WORLD_LAYERS['main']])
+        for sprite in self.pending_sprites:
+            if sprite.z != WORLD_LAYERS['main']:
+                self.spatial_hash.insert(sprite)
+        self.pending_sprites.clear()
+
+    def refresh_moving(self):
+        super().refresh_moving()
+        for sprite in self.moving_sprites:
+            self.main_layer.refresh(sprite)
+
+    def update(self, dt):
+        self.previous_positions = {sprite: vector(sprite.rect.topleft) for sprite in self.moving_sprites}
+        self.animation_clock.update(dt)
+        for sprite in list(self.updating_sprites):
+            sprite.update(dt)
+        self.refresh_moving()
+
+    def empty(self):
+        super().empty()
+        self.terrain_chunks.empty()
+        self.main_layer.clear()
+        self.animation_clock.clear()
+        self.previous_positions.clear()
+
+    def get_draw_rect(self, sprite, interpolation):
+        previous_pos = self.previous_positions.get(sprite)
+        if previous_pos is None or interpolation >= 1:
+            return sprite.rect
+        draw_rect = sprite.rect.copy()
+        draw_rect.topleft = previous_pos.lerp(sprite.rect.topleft, interpolation)
+        return draw_rect
+
+    def draw(self, player, interpolation=1):
         window_width = config_manager.settings['video']['window_width']
         window_height = config_manager.settings['video']['window_height']
 
-        self.offset.x = -(player.rect.centerx - window_width / 2)
-        self.offset.y = -(player.rect.centery - window_height / 2)
+        # the camera follows where the player is drawn, not where the simulation has it
+        player_rect = self.get_draw_rect(player, interpolation)
+        self.offset.x = -(player_rect.centerx - window_width / 2)
+        self.offset.y = -(player_rect.centery - window_height / 2)
 
         # Define the visible area (viewport) based on the player's position
         visible_area = pygame.Rect(
-            player.rect.centerx - window_width / 2,
-            player.rect.centery - window_height / 2,
+            player_rect.centerx - window_width / 2,
+            player_rect.centery - window_height / 2,
             window_width,
             window_height
         )
 
-        bg_sprites = [sprite for sprite in self if sprite.z < WORLD_LAYERS['main']]
-        main_sprites = sorted([sprite for sprite in self if sprite.z == WORLD_LAYERS['main']],
-                              key=lambda sprite: sprite.y_sort)
-        fg_sprites = [sprite for sprite in self if sprite.z > WORLD_LAYERS['main']]
+        self.terrain_chunks.draw(self.display_surface, visible_area, self.offset)
+
+        visible_sprites = self.query(visible_area)
+        bg_sprites = [sprite for sprite in visible_sprites if sprite.z < WORLD_LAYERS['main']]
+        main_sprites = self.main_layer.query(visible_area)
+        fg_sprites = [sprite for sprite in visible_sprites if sprite.z > WORLD_LAYERS['main']]
+        self.drawn_count = len(bg_sprites) + len(main_sprites) + len(fg_sprites)
 
         for layer in (bg_sprites, main_sprites, fg_sprites):
             for sprite in layer:
-                # Check if the sprite is within the visible area
-                if sprite.rect.colliderect(visible_area):
-                    if isinstance(sprite, Entity):
-                        self.display_surface.blit(self.shadow_surf, sprite.rect.topleft + self.offset + vector(40, 108))
-                    self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
-                    if sprite == player and player.noticed:
-                        rect = self.notice_surf.get_rect(midbottom=sprite.rect.midtop)
-                        self.display_surface.blit(self.notice_surf, rect.topleft + self.offset)
+                draw_rect = self.get_draw_rect(sprite, interpolation)
+                if isinstance(sprite, Entity):
+                    self.display_surface.blit(self.shadow_surf, draw_rect.topleft + self.offset + vector(40, 108))
+                self.display_surface.blit(sprite.image, draw_rect.topleft + self.offset)
+                if sprite == player and player.noticed:
+                    rect = self.notice_surf.get_rect(midbottom=draw_rect.midtop)
+                    self.display_surface.blit(self.notice_surf, rect.topleft + self.offset)
 
         # Draw hitboxes for all sprites in collision_sprites and for player
         if config_manager.settings['show_hitbox']:
-            for sprite in self.collision_sprites:
-                if hasattr(sprite, 'hitbox') and sprite.hitbox.colliderect(visible_area):
-                    hitbox_copy = sprite.hitbox.copy()
-                    hitbox_surf = pygame.Surface((int(hitbox_copy.width), int(hitbox_copy.height)), pygame.SRCALPHA)
-                    hitbox_surf.fill((255, 0, 0, 128))  # Semi-transparent red for visibility
-                    hitbox_rect = hitbox_copy.move(self.offset)  # Move the hitbox by the offset
-                    self.display_surface.blit(hitbox_surf, hitbox_rect.topleft)
+            for sprite in self.collision_sprites.query(visible_area):
+                hitbox_copy = sprite.hitbox.copy()
+                hitbox_surf = pygame.Surface((int(hitbox_copy.width), int(hitbox_copy.height)), pygame.SRCALPHA)
+                hitbox_surf.fill((255, 0, 0, 128))  # Semi-transparent red for visibility
+                hitbox_rect = hitbox_copy.move(self.offset)  # Move the hitbox by the offset
+                self.display_surface.blit(hitbox_surf, hitbox_rect.topleft)
             for sprite in self:
                 if sprite == player:
                     hitbox_copy = sprite.hitbox.copy()
@@ -0,0 +1,332 @@
+import os
+import struct
+import tempfile
+import xml.etree.ElementTree as ElementTree
+from array import array
+from os.path import join, normpath, basename, splitext, dirname
+from settings import *
+from debug import debug
+from pytmx import TiledMap, TiledTileLayer, TiledObjectGroup, TileFlags
+from pytmx.util_pygame import handle_transformation, smart_convert
+
+# compiled map layout (little endian)
+#   header      magic, format version, tmx mtime / size, map width / height in tiles, tile width / height
+#   sources     count, then mtime / size and path of every tileset and image the map was compiled from
+#   strings     count, then length + utf-8 bytes for every name, path and string property
+#   images      count, then source / colorkey string, rect (all -1 for whole images) and flip flags per gid
+#   layers      count, then kind + name, followed by a gid array (tiles) or object records (objects)
+#   properties  count, then key string, type tag and an 8 byte value per property
+HEADER = struct.Struct('<4sHqqHHHH')
+COUNT = struct.Struct('<I')
+SOURCE = struct.Struct('<qqH')
+STRING = struct.Struct('<H')
+IMAGE = struct.Struct('<Iiiiiii')
+LAYER = struct.Struct('<BI')
+OBJECT = struct.Struct('<iddddHIH')
+PROPERTY = struct.Struct('<IB8s')
+MAGIC = b'RPGM'
+TILE_LAYER, OBJECT_LAYER = 0, 1
+
+
+def record_image(filename, colorkey, **kwargs):
+    # stands in for the pygame image loader, so compiling parses the xml without touching any image
+    return lambda rect=None, flags=None: (filename, colorkey, rect, flags)
+
+
+class TileLayer:
+    def __init__(self, name, width, gids, images):
+        self.name = name
+        self.width = width
+        self.gids = gids
+        self.images = images
+
+    def tiles(self):
+        for index, gid in enumerate(self.gids):
+            if gid:
+                yield index % self.width, index // self.width, self.images[gid]
+
+
+class MapObject:
+    def __init__(self, name, x, y, width, height, image, properties):
+        self.name = name
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.image = image
+        self.properties = properties
+
+
+class CompiledMap:
+    """The part of pytmx.TiledMap that Game.setup uses, built from a compiled map file."""
+    def __init__(self, width, height, tilewidth, tileheight, layers):
+        self.width, self.height = width, height
+        self.tilewidth, self.tileheight = tilewidth, tileheight
+        # like pytmx, a later layer wins when two layers share a name
+        self.layernames = {layer_name: layer for layer_name, layer in layers}
+
+    def get_layer_by_name(self, name):
+        try:
+            return self.layernames[name]
+        except KeyError:
+            raise ValueError(f'Layer "{name}" not found.')
+
+
+class MapCompiler:
+    def __init__(self, filepath='../save_data/cache/maps/'):
+        self.filepath = filepath
+        self.sheets = {}
+        self.tiles = {}
+        self.ensure_directory_exists()
+
+    def ensure_directory_exists(self):
+        if not os.path.exists(self.filepath):
+            os.makedirs(self.filepath)
+
+    def get_full_path(self, tmx_path):
+        return join(self.filepath, splitext(basename(tmx_path))[0] + '.map')
+
+    def load(self, tmx_path):
+        """Load the compiled version of a tmx map, compiling it first if it is missing or older than the tmx."""
+        return self.build(self.prepare(tmx_path))
+
+    @staticmethod
+    def get_sources(tmx_path, tmx_map):
+        """The files besides the tmx that end up in the compiled map, its external tilesets and their images."""
+        sources = {normpath(join(dirname(tmx_path), tileset.get('source')))
+                   for tileset in ElementTree.parse(tmx_path).getroot().iter('tileset') if tileset.get('source')}
+        sources.update(normpath(image[0]) for image in tmx_map.images[1:] if image)
+        return sorted(sources)
+
+    @staticmethod
+    def pack_sources(sources):
+        packed = [COUNT.pack(len(sources))]
+        for source in sources:
+            stat = os.stat(source)
+            encoded_source = source.encode()
+            packed.append(SOURCE.pack(stat.st_mtime_ns, stat.st_size, len(encoded_source)) + encoded_source)
+        return b''.join(packed)
+
+    @staticmethod
+    def unpack_sources(data):
+        """The (mtime, size, path) of every source and the offset of the section after them."""
+        sources = []
+        offset = HEADER.size
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        for _ in range(count):
+            mtime, size, length = SOURCE.unpack_from(data, offset)
+            offset += SOURCE.size
+            sources.append((mtime, size, data[offset:offset + length].decode()))
+            offset += length
+        return sources, offset
+
+    @staticmethod
+    def is_stale(data, stat):
+        magic, version, mtime, size = HEADER.unpack_from(data)[:4]
+        if magic != MAGIC or version != MAP_FORMAT_VERSION or (mtime, size) != (stat.st_mtime_ns, stat.st_size):
+            return True
+        # an edited tileset or tileset image changes the map as much as an edited tmx
+        for source_mtime, source_size, source in MapCompiler.unpack_sources(data)[0]:
+            if not os.path.exists(source):
+                return True
+            source_stat = os.stat(source)
+            if (source_mtime, source_size) != (source_stat.st_mtime_ns, source_stat.st_size):
+                return True
+        return False
+
+    @staticmethod
+    def read(full_path):
+        if not os.path.exists(full_path):
+            return None
+        try:
+            with open(full_path, 'rb') as map_file:
+                data = map_file.read()
+        except IOError as e:
+            debug(f"Discarding unreadable compiled map {full_path}: {e}")
+            return None
+        return data if len(data) >= HEADER.size else None
+
+    @staticmethod
+    def write(full_path, data):
+        # a temp file of its own, the prefetch worker and the main thread can compile the same map at once
+        temp_path = None
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix='.tmp')
+            with os.fdopen(file_descriptor, 'wb') as map_file:
+                map_file.write(data)
+            os.replace(temp_path, full_path)
+        except IOError as e:
+            debug(f"An error occurred while writing the compiled map: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def compile(tmx_path, stat=None):
+        """Parse a tmx file once with pytmx and pack it into the compiled map layout."""
+        stat = stat or os.stat(tmx_path)
+        tmx_map = TiledMap(tmx_path, image_loader=record_image)
+        strings, string_ids = [], {}
+
+        def string_id(string):
+            if string not in string_ids:
+                string_ids[string] = len(strings)
+                strings.append(string)
+            return string_ids[string]
+
+        images = []
+        for image in tmx_map.images[1:]:
+            filename, colorkey, rect, flags = image
+            rect = rect or (-1, -1, -1, -1)
+            flag_bits = sum(bit << i for i, bit in enumerate(flags)) if flags else -1
+            images.append(IMAGE.pack(string_id(normpath(filename)), string_id(colorkey) if colorkey else -1,
+                                     *rect, flag_bits))
+
+        layers, properties = [], []
+        for layer in tmx_map.layers:
+            if isinstance(layer, TiledTileLayer):
+                gids = array('H', (gid for row in layer.data for gid in row))
+                layers.append(LAYER.pack(TILE_LAYER, string_id(layer.name)) + gids.tobytes())
+            elif isinstance(layer, TiledObjectGroup):
+                objects = [COUNT.pack(len(layer))]
+                for obj in layer:
+                    # tile properties that pytmx merged into the object come along, lists and the like are dropped
+                    props = [(key, value) for key, value in obj.properties.items()
+                             if value is None or isinstance(value, (bool, int, float, str))]
+                    objects.append(OBJECT.pack(string_id(obj.name) if obj.name is not None else -1,
+                                               obj.x, obj.y, obj.width, obj.height, obj.gid,
+                                               len(properties), len(props)))
+                    for key, value in props:
+                        properties.append(MapCompiler.pack_property(string_id(key), value, string_id))
+                layers.append(LAYER.pack(OBJECT_LAYER, string_id(layer.name)) + b''.join(objects))
+
+        encoded_strings = [string.encode() for string in strings]
+        return b''.join([
+            HEADER.pack(MAGIC, MAP_FORMAT_VERSION, stat.st_mtime_ns, stat.st_size,
+                        tmx_map.width, tmx_map.height, tmx_map.tilewidth, tmx_map.tileheight),
+            MapCompiler.pack_sources(MapCompiler.get_sources(tmx_path, tmx_map)),
+            COUNT.pack(len(strings)), *(STRING.pack(len(string)) + string for string in encoded_strings),
+            COUNT.pack(len(images)), *images,
+            COUNT.pack(len(layers)), *layers,
+            COUNT.pack(len(properties)), *properties])
+
+    @staticmethod
+    def pack_property(key, value, string_id):
+        if value is None:
+            return PROPERTY.pack(key, ord('n'), bytes(8))
+        if isinstance(value, bool):
+            return PROPERTY.pack(key, ord('b'), struct.pack('<q', value))
+        if isinstance(value, int):
+            return PROPERTY.pack(key, ord('i'), struct.pack('<q', value))
+        if isinstance(value, float):
+            return PROPERTY.pack(key, ord('f'), struct.pack('<d', value))
+        return PROPERTY.pack(key, ord('s'), struct.pack('<q', string_id(value)))
+
+    def parse(self, data):
+        """Unpack a compiled map into plain python data, the tile images are only resolved by build()."""
+        header = HEADER.unpack_from(data)
+        width, height = header[4:6]
+        offset = self.unpack_sources(data)[1]
+
+        strings = []
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        for _ in range(count):
+            length = STRING.unpack_from(data, offset)[0]
+            strings.append(data[offset + STRING.size:offset + STRING.size + length].decode())
+            offset += STRING.size + length
+
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        images = [(strings[source], strings[colorkey] if colorkey >= 0 else None, *image)
+                  for source, colorkey, *image in IMAGE.iter_unpack(data[offset:offset + count * IMAGE.size])]
+        offset += count * IMAGE.size
+
+        layers = []
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        for _ in range(count):
+            kind, name = LAYER.unpack_from(data, offset)
+            offset += LAYER.size
+            if kind == TILE_LAYER:
+                gids = array('H')
+                gids.frombytes(data[offset:offset + width * height * gids.itemsize])
+                offset += width * height * gids.itemsize
+                layers.append((strings[name], kind, gids))
+            else:
+                object_count = COUNT.unpack_from(data, offset)[0]
+                offset += COUNT.size
+                records = list(OBJECT.iter_unpack(data[offset:offset + object_count * OBJECT.size]))
+                offset += object_count * OBJECT.size
+                layers.append((strings[name], kind, records))
+
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        properties = [(strings[key], self.unpack_property(tag, value, strings))
+                      for key, tag, value in PROPERTY.iter_unpack(data[offset:offset + count * PROPERTY.size])]
+
+        for index, (name, kind, records) in enumerate(layers):
+            if kind == OBJECT_LAYER:
+                layers[index] = (name, kind, [
+                    (strings[obj_name] if obj_name >= 0 else None, x, y, obj_width, obj_height, gid,
+                     dict(properties[start:start + prop_count]))
+                    for obj_name, x, y, obj_width, obj_height, gid, start, prop_count in records])
+        return {'header': header[4:], 'images': images, 'layers': layers}
+
+    def get_data(self, tmx_path):
+        """The compiled bytes of a map, compiled first if they are missing or older than the tmx or its tilesets."""
+        stat = os.stat(tmx_path)
+        data = self.read(self.get_full_path(tmx_path))
+        if data is None or self.is_stale(data, stat):
+            data = self.compile(tmx_path, stat)
+            self.write(self.get_full_path(tmx_path), data)
+        return data
+
+    def prepare(self, tmx_path):
+        """Everything up to converting the tile images, safe to run on a worker thread."""
+        parsed_map = self.parse(self.get_data(tmx_path))
+        for source, *_ in parsed_map['images']:
+            self.load_sheet(source)
+        return parsed_map
+
+    def build(self, parsed_map):
+        """Resolve the tile images of a parsed map, converting needs the display so this runs on the main thread."""
+        width = parsed_map['header'][0]
+        images = [None] + [self.load_image(*image) for image in parsed_map['images']]
+        layers = []
+        for name, kind, records in parsed_map['layers']:
+            if kind == TILE_LAYER:
+                layers.append((name, TileLayer(name, width, records, images)))
+            else:
+                layers.append((name, [MapObject(obj_name, x, y, obj_width, obj_height, images[gid], properties)
+                                      for obj_name, x, y, obj_width, obj_height, gid, properties in records]))
+        return CompiledMap(*parsed_map['header'], layers)
+
+    @staticmethod
+    def unpack_property(tag, value, strings):
+        tag = chr(tag)
+        if tag == 'n':
+            return None
+        if tag == 'f':
+            return struct.unpack('<d', value)[0]
+        number = struct.unpack('<q', value)[0]
+        return bool(number) if tag == 'b' else strings[number] if tag == 's' else number
+
+    def load_sheet(self, source):
+        if source not in self.sheets:
+            self.sheets[source] = pygame.image.load(source)
+        return self.sheets[source]
+
+    def load_image(self, source, colorkey, x, y, width, height, flag_bits):
+        # maps share most of their tiles, every distinct tile is only cut and converted once
+        key = (source, colorkey, x, y, width, height, flag_bits)
+        if key not in self.tiles:
+            sheet = self.load_sheet(source)
+
+            # same steps as the pytmx pygame loader, so tiles come out in the same pixel format
+            tile = sheet.subsurface((x, y, width, height)) if width >= 0 else sheet.copy()
+            if flag_bits >= 0:
+                tile = handle_transformation(tile, TileFlags(*((flag_bits >> i) & 1 for i in range(3))))
+            self.tiles[key] = smart_convert(tile, pygame.Color(f'#{colorkey}') if colorkey else None, True)
+        return self.tiles[key]
+
+
+map_compiler = MapCompiler()
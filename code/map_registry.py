@@ -0,0 +1,52 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, splitext
+from settings import *
+from map_compiler import map_compiler
+
+
+class MapRegistry:
+    def __init__(self, *path, size=MAP_REGISTRY_SIZE):
+        self.path = join(*path)
+        self.size = size
+        # only the names are known up front, a map is loaded the first time it is asked for
+        self.names = {splitext(file)[0] for file in os.listdir(self.path) if file.endswith('.tmx')}
+        self.maps = OrderedDict()
+        self.prefetched = OrderedDict()
+        self.executor = ThreadPoolExecutor(1)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def get(self, name):
+        """Return a map, loading it if it isn't resident and evicting the least recently used ones beyond size."""
+        if name not in self.names:
+            raise KeyError(name)
+        if name in self.maps:
+            self.maps.move_to_end(name)
+        else:
+            if name in self.prefetched:
+                # waits for the worker if it isn't done yet, which is still less than starting from scratch
+                parsed_map = self.prefetched.pop(name).result()
+            else:
+                parsed_map = map_compiler.prepare(join(self.path, f'{name}.tmx'))
+            self.maps[name] = map_compiler.build(parsed_map)
+            while len(self.maps) > self.size:
+                self.maps.popitem(last=False)
+        return self.maps[name]
+
+    def prefetch(self, name):
+        """Start reading and parsing a map on the worker thread, so a later get() only has to build it."""
+        if name not in self.names or name in self.maps or name in self.prefetched:
+            return
+        self.prefetched[name] = self.executor.submit(map_compiler.prepare, join(self.path, f'{name}.tmx'))
+        while len(self.prefetched) > self.size:
+            self.prefetched.popitem(last=False)[1].cancel()
+
+    def clear(self):
+        self.maps.clear()
+        self.prefetched.clear()
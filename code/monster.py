@@ -1,18 +1,44 @@
 from game_data import game_data
+from damage import ELEMENT_IDS
+
+
+# stats of a species at a level, shared by every monster that has them
+stats_cache = {}
+
+
+def get_level_stats(name, level):
+    if (name, level) not in stats_cache:
+        base_stats = game_data.monster_data[name]['stats']
+        stats = {stat: value * level for stat, value in base_stats.items() if stat != 'element'}
+        stats['max_energy'] = max(1, base_stats['max_energy'] * (level // 10))
+        shown_stats = {
+            'health': stats['max_health'],
+            'energy': stats['max_energy'],
+            'attack': stats['attack'],
+            'power': stats['power'],
+            'defense': stats['defense'],
+            'speed': stats['speed'],
+        }
+        stats_cache[name, level] = stats, shown_stats
+    return stats_cache[name, level]
 
 
 class Monster:
+    # no __dict__ per monster, a party can hold hundreds of them
+    __slots__ = ('name', '_level', 'paused', 'element', 'element_id', 'health', 'energy', 'abilities',
+                 'defending', 'exp', 'level_up', 'evolution', 'stats', 'shown_stats', 'unlocked_abilities')
+
     def __init__(self, name, level):
         self.name = name
-        self.level = level
         self.paused = True
 
         # stats
         self.element = game_data.monster_data[name]['stats']['element']
-        self.base_stats = game_data.monster_data[name]['stats']
-        self.health = self.base_stats['max_health'] * self.level
-        self.energy = max(1, self.base_stats['max_energy'] * (self.level // 10))
+        self.element_id = ELEMENT_IDS[self.element]
         self.abilities = game_data.monster_data[name]['abilities']
+        self.level = level
+        self.health = self.stats['max_health']
+        self.energy = self.stats['max_energy']
         self.defending = False
 
         # experience
@@ -20,6 +46,20 @@ class Monster:
         self.level_up = self.level * self.level * 150
         self.evolution = game_data.monster_data[self.name]['evolve']
 
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, level):
+        self._level = level
+        self.update_stats()
+
+    def update_stats(self):
+        """Look up what the level unlocks, evolving creates a new Monster so only a level change needs this."""
+        self.stats, self.shown_stats = get_level_stats(self.name, self._level)
+        self.unlocked_abilities = tuple(ability for lvl, ability in self.abilities.items() if self._level >= lvl)
+
     def reduce_energy(self, attack):
         self.energy -= game_data.attack_data[attack]['cost']
 
@@ -38,32 +78,21 @@ class Monster:
 
     # getters
     def get_stat(self, stat):
-        return self.base_stats[stat] * self.level if stat != 'max_energy'\
-            else max(1, self.base_stats['max_energy'] * (self.level // 10))
+        return self.stats[stat]
 
     def get_stats(self):
-        return {
-            'health': self.get_stat('max_health'),
-            'energy': self.get_stat('max_energy'),
-            'attack': self.get_stat('attack'),
-            'power': self.get_stat('power'),
-            'defense': self.get_stat('defense'),
-            'speed': self.get_stat('speed'),
-        }
+        return self.shown_stats
 
     def get_base_damage(self, attack):
-        return self.get_stat('attack') * game_data.attack_data[attack]['amount']
+        return self.stats['attack'] * game_data.attack_data[attack]['amount']
 
     def get_abilities(self, all_abilities=True):
-        if all_abilities:
-            return [ability for lvl, ability in self.abilities.items() if self.level >= lvl]
-        else:
-            return [ability for lvl, ability in self.abilities.items() if self.level >= lvl]
+        return self.unlocked_abilities
 
     def get_info(self):
         return (
-            (self.health, self.get_stat('max_health')),
-            (self.energy, self.get_stat('max_energy'))
+            (self.health, self.stats['max_health']),
+            (self.energy, self.stats['max_energy'])
         )
 
     # save/load
@@ -80,8 +109,15 @@ class Monster:
         self.health = data['health']
         self.abilities = {int(k): v for k, v in data['abilities'].items()}
         self.exp = data['exp']
-        self.level = data['level']
         self.name = data['name']
+        self.level = data['level']
+
+    def __copy__(self):
+        # the battle search copies monsters all the time, copy.copy of a __slots__ class goes through __reduce_ex__
+        monster = Monster.__new__(Monster)
+        for slot in Monster.__slots__:
+            setattr(monster, slot, getattr(self, slot))
+        return monster
 
     def __repr__(self):
         return f"{self.name} at level {self.level}"
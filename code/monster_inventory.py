@@ -8,10 +8,16 @@ from game_data import game_data
 
 class MonsterInventory:
     # main
-    def __init__(self, monsters, fonts, monster_frames):
+    def __init__(self, monsters, storage, fonts, monster_frames):
         self.display_surface = pygame.display.get_surface()
         self.fonts = fonts
         self.monsters = monsters
+        self.storage = storage
+
+        # pages, a and d switch between the party and the storage
+        self.page = 'party'
+        self.sort_keys = ('level', 'name', 'element')
+        self.sort_index = 0
 
         # frames
         self.icon_frames = monster_frames['icons']
@@ -50,13 +56,22 @@ class MonsterInventory:
         self.max_stats['energy'] = self.max_stats.pop('max_energy')
 
     # input
+    def get_monsters(self):
+        return self.monsters if self.page == 'party' else self.storage
+
     def input(self):
         keys = pygame.key.get_just_pressed()
+        if keys[pygame.K_a] or keys[pygame.K_d]:
+            self.page = 'storage' if self.page == 'party' else 'party'
+            self.index = 0
+            self.selected_index = None
         if keys[pygame.K_w]:
             self.index -= 1
         if keys[pygame.K_s]:
             self.index += 1
-        if keys[pygame.K_f] or keys[pygame.K_SPACE]:
+        if keys[pygame.K_e]:
+            self.move_monster()
+        if self.page == 'party' and (keys[pygame.K_f] or keys[pygame.K_SPACE]):
             if self.selected_index is not None:
                 selected_monster = self.monsters[self.selected_index]
                 current_monster = self.monsters[self.index]
@@ -65,8 +80,23 @@ class MonsterInventory:
                 self.selected_index = None
             else:
                 self.selected_index = self.index
-
-        self.index = self.index % len(self.monsters)
+        if self.page == 'storage' and keys[pygame.K_r] and self.storage:
+            self.storage.sort(self.sort_keys[self.sort_index], reverse=self.sort_keys[self.sort_index] == 'level')
+            self.sort_index = (self.sort_index + 1) % len(self.sort_keys)
+
+        self.index = self.index % max(1, len(self.get_monsters()))
+
+    def move_monster(self):
+        # e deposits the monster in the party or withdraws the one in storage, the party keeps at least one
+        if self.page == 'party' and len(self.monsters) > 1:
+            self.storage.add(self.monsters[self.index])
+            # close the gap, the party is numbered from 0
+            for index in range(self.index, len(self.monsters) - 1):
+                self.monsters[index] = self.monsters[index + 1]
+            del self.monsters[len(self.monsters) - 1]
+            self.selected_index = None
+        elif self.page == 'storage' and self.storage and len(self.monsters) < PARTY_SIZE:
+            self.monsters[len(self.monsters)] = self.storage.take(self.index)
 
     # drawing
     def draw_list(self):
@@ -74,8 +104,12 @@ class MonsterInventory:
         bg_rect = pygame.FRect(self.main_rect.topleft, (self.list_width, self.main_rect.height))
         pygame.draw.rect(self.display_surface, COLORS['gray'], bg_rect, 0, 0, 12, 0, 12, 0)
 
+        monsters = self.get_monsters()
         v_offset = 0 if self.index < self.visible_items else -(self.index - self.visible_items + 1) * self.item_height
-        for index, monster in self.monsters.items():
+        # only the rows in view, storage can hold thousands
+        first_index = max(0, self.index - self.visible_items + 1)
+        for index in range(first_index, min(len(monsters), first_index + self.visible_items)):
+            monster = monsters[index]
             # colors
             bg_color = COLORS['gray'] if self.index != index else COLORS['light']
             text_color = COLORS['white'] if self.selected_index != index else COLORS['gold']
@@ -102,14 +136,14 @@ class MonsterInventory:
                 self.display_surface.blit(icon_surf, icon_rect)
 
         # lines between monsters
-        for i in range(1, min(self.visible_items, len(self.monsters))):
+        for i in range(1, min(self.visible_items, len(monsters))):
             y = self.main_rect.top + self.item_height * i
             left = self.main_rect.left
             right = self.main_rect.left + self.list_width
             pygame.draw.line(self.display_surface, COLORS['light-gray'], (left, y), (right, y))
 
         # Display slider if necessary
-        total_items = len(self.monsters)
+        total_items = len(monsters)
         if total_items > self.visible_items:
             # color
             slider_color = COLORS['light-gray']
@@ -134,9 +168,18 @@ class MonsterInventory:
         self.display_surface.blit(shadow_surf, (self.main_rect.left + self.list_width - shadow_surf_width,
                                                 self.main_rect.top))
 
+    def draw_title(self):
+        if self.page == 'party':
+            title = f'Party {len(self.monsters)}/{PARTY_SIZE}'
+        else:
+            title = f'Storage {len(self.storage)}'
+        title_surf = self.fonts['bold'].render(title, False, COLORS['white'])
+        title_rect = title_surf.get_frect(bottomleft=self.main_rect.topleft + vector(0, -10))
+        self.display_surface.blit(title_surf, title_rect)
+
     def draw_main(self, dt):
         # data
-        monster = self.monsters[self.index]
+        monster = self.get_monsters()[self.index]
 
         # main bg
         main_rect = pygame.FRect(self.main_rect.left + self.list_width, self.main_rect.top,
@@ -315,5 +358,7 @@ class MonsterInventory:
     def update(self, dt):
         self.input()
         self.display_surface.blit(self.tint_surf, (0, 0))
+        self.draw_title()
         self.draw_list()
-        self.draw_main(dt)
+        if self.get_monsters():
+            self.draw_main(dt)
@@ -0,0 +1,56 @@
+from settings import *
+from math import ceil, floor, inf
+
+
+class OccupancyGrid:
+    """The static obstacles of a map for line of sight, characters move and are checked by Characters.has_los."""
+    def __init__(self, width, height, cell_size=LOS_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = ceil(width / cell_size)
+        self.rows = ceil(height / cell_size)
+        self.cells = bytearray(self.cols * self.rows)
+        # cell index -> the rects overlapping it, only blocked cells have an entry
+        self.rects = {}
+
+    def block(self, rect):
+        # a pixel of margin, so a rect the rasterized line touches is always in a cell the ray walks through
+        left = max(0, int((rect.left - 1) // self.cell_size))
+        right = min(self.cols - 1, int((rect.right + 1) // self.cell_size))
+        top = max(0, int((rect.top - 1) // self.cell_size))
+        bottom = min(self.rows - 1, int((rect.bottom + 1) // self.cell_size))
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                self.cells[row * self.cols + col] = 1
+                self.rects.setdefault(row * self.cols + col, []).append(rect)
+
+    def is_blocked(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows and self.cells[row * self.cols + col] == 1
+
+    def has_los(self, start, end):
+        """Walk the cells between two points (DDA) and clip the line against the rects of the blocked ones, the
+        same answer as clipping it against every rect of the map."""
+        x, y = start[0] / self.cell_size, start[1] / self.cell_size
+        dx, dy = end[0] / self.cell_size - x, end[1] / self.cell_size - y
+        col, row = floor(x), floor(y)
+        steps = abs(floor(x + dx) - col) + abs(floor(y + dy) - row)
+
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        delta_x = abs(1 / dx) if dx else inf
+        delta_y = abs(1 / dy) if dy else inf
+        # distance along the ray (0 - 1) until the next vertical / horizontal cell border
+        next_x = (col + (dx > 0) - x) / dx if dx else inf
+        next_y = (row + (dy > 0) - y) / dy if dy else inf
+
+        for _ in range(steps + 1):
+            if self.is_blocked(col, row):
+                for rect in self.rects[row * self.cols + col]:
+                    if rect.clipline(start, end):
+                        return False
+            if next_x < next_y:
+                next_x += delta_x
+                col += step_x
+            else:
+                next_y += delta_y
+                row += step_y
+        return True
@@ -16,6 +16,7 @@ class Options:
     def __init__(self, bg_surf, funcs, main_menu=False):
         # display
         self.display_surface = pygame.display.get_surface()
+        self.clock = pygame.time.Clock()
         self.bg_surf = pygame.transform.scale(bg_surf, (config_manager.settings['video']['window_width'],
                                                         config_manager.settings['video']['window_height']))
 
@@ -587,6 +588,7 @@ class Options:
         self.adjust_fonts()
 
         while self.running:
+            self.clock.tick(config_manager.settings['video']['frame_cap'])
             self.display_surface.fill(COLORS['black'])
             # event handler
             for event in pygame.event.get():
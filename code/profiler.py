@@ -0,0 +1,115 @@
+import time
+from collections import deque
+from settings import *
+
+
+class Scope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        # scopes entered several times a frame (fixed steps) add up
+        times = self.profiler.frame_scopes
+        times[self.name] = times.get(self.name, 0) + (time.perf_counter() - self.start) * 1000
+
+
+class NullScope:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SCOPE = NullScope()
+
+
+class Profiler:
+    def __init__(self, history=PROFILER_HISTORY):
+        self.enabled = False
+        self.history = history
+        self.scopes = {}
+        self.scope_times = {}
+        self.frame_scopes = {}
+        self.frame_times = deque(maxlen=history)
+        self.counts = {}
+        self.frame_start = 0
+        self.font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.scope_times.clear()
+        self.frame_scopes.clear()
+        self.frame_times.clear()
+        self.counts.clear()
+
+    def scope(self, name):
+        """Time a block under a name, a shared do-nothing scope while the profiler is off."""
+        if not self.enabled:
+            return NULL_SCOPE
+        if name not in self.scopes:
+            self.scopes[name] = Scope(self, name)
+        return self.scopes[name]
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counts[name] = value
+
+    def start_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frame_times.append((time.perf_counter() - self.frame_start) * 1000)
+        for name in self.frame_scopes:
+            if name not in self.scope_times:
+                self.scope_times[name] = deque(maxlen=self.history)
+        # scopes that didn't run this frame count as zero, so the averages stay over the same frames
+        for name, times in self.scope_times.items():
+            times.append(self.frame_scopes.get(name, 0))
+        self.frame_scopes.clear()
+        self.counts.clear()
+
+    def draw(self, surface):
+        if not self.enabled or not self.frame_times:
+            return
+        if not self.font:
+            self.font = pygame.font.Font(None, 22)
+
+        # rolling averages over the last frames
+        lines = [('frame', f'{sum(self.frame_times) / len(self.frame_times):.2f} ms'),
+                 ('frame max', f'{max(self.frame_times):.2f} ms')]
+        lines.extend((name, f'{sum(times) / len(times):.2f} ms') for name, times in self.scope_times.items())
+        lines.extend((name, str(value)) for name, value in self.counts.items())
+
+        line_height = self.font.get_linesize()
+        graph_height = 60
+        panel = pygame.Rect(10, 10, 320, line_height * len(lines) + graph_height + 20)
+        pygame.draw.rect(surface, COLORS['black'], panel)
+        for index, (name, value) in enumerate(lines):
+            y = panel.y + 6 + index * line_height
+            surface.blit(self.font.render(name, True, COLORS['white']), (panel.x + 6, y))
+            value_surf = self.font.render(value, True, COLORS['white'])
+            surface.blit(value_surf, value_surf.get_rect(topright=(panel.right - 6, y)))
+
+        # frame time graph, the line marks the 60 fps budget
+        graph = pygame.Rect(panel.x + 6, panel.bottom - graph_height - 6, panel.width - 12, graph_height)
+        scale = graph_height / max(max(self.frame_times), PROFILER_BUDGET_MS * 2)
+        bar_width = graph.width / self.history
+        for index, frame_time in enumerate(self.frame_times):
+            bar_height = max(1, frame_time * scale)
+            color = COLORS['red'] if frame_time > PROFILER_BUDGET_MS else COLORS['blue']
+            pygame.draw.rect(surface, color, (graph.x + index * bar_width, graph.bottom - bar_height,
+                                              max(1, bar_width), bar_height))
+        budget_y = graph.bottom - PROFILER_BUDGET_MS * scale
+        pygame.draw.line(surface, COLORS['gold'], (graph.x, budget_y), (graph.right, budget_y))
+
+
+profiler = Profiler()
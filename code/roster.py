@@ -0,0 +1,148 @@
+from array import array
+from game_data import game_data
+from monster import Monster, get_level_stats
+
+# species interned to small integers for the species column
+SPECIES = tuple(game_data.monster_data)
+SPECIES_IDS = {name: index for index, name in enumerate(SPECIES)}
+
+# column name -> array typecode, one value per stored monster
+COLUMNS = {'species': 'H', 'level': 'H', 'exp': 'L', 'health': 'l', 'energy': 'l'}
+
+
+class MonsterRecord:
+    """A stored monster read straight from the columns of its row, what the inventory needs of a Monster. Rows move
+    when the roster is sorted or a monster leaves it, so a record is only good until then."""
+    __slots__ = ('roster', 'row')
+
+    def __init__(self, roster, row):
+        self.roster = roster
+        self.row = row
+
+    @property
+    def name(self):
+        return SPECIES[self.roster.columns['species'][self.row]]
+
+    @property
+    def level(self):
+        return self.roster.columns['level'][self.row]
+
+    @property
+    def exp(self):
+        return self.roster.columns['exp'][self.row]
+
+    @property
+    def health(self):
+        return self.roster.columns['health'][self.row]
+
+    @property
+    def energy(self):
+        return self.roster.columns['energy'][self.row]
+
+    @property
+    def element(self):
+        return game_data.monster_data[self.name]['stats']['element']
+
+    @property
+    def level_up(self):
+        return self.level * self.level * 150
+
+    def get_stat(self, stat):
+        return get_level_stats(self.name, self.level)[0][stat]
+
+    def get_stats(self):
+        return get_level_stats(self.name, self.level)[1]
+
+    def get_abilities(self, all_abilities=True):
+        return tuple(ability for lvl, ability in game_data.monster_data[self.name]['abilities'].items()
+                     if self.level >= lvl)
+
+    def __repr__(self):
+        return f"{self.name} at level {self.level} (stored)"
+
+
+class Roster:
+    """Monsters in storage as columns of small integers instead of Monster objects, so boxes of thousands stay
+    cheap to keep, sort, filter and save. Monsters go in with add() and come out as a Monster with take()."""
+    def __init__(self):
+        self.columns = {column: array(typecode) for column, typecode in COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.columns['species'])
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return MonsterRecord(self, row)
+
+    def __iter__(self):
+        return (MonsterRecord(self, row) for row in range(len(self)))
+
+    # party operations
+    def add(self, monster):
+        """Store a monster, anything a Monster keeps apart from these columns comes from its species again."""
+        values = {'species': SPECIES_IDS[monster.name], 'level': monster.level, 'exp': int(monster.exp),
+                  'health': int(monster.health), 'energy': int(monster.energy)}
+        for column, values_column in self.columns.items():
+            values_column.append(values[column])
+        return len(self) - 1
+
+    def get_monster(self, row):
+        monster = Monster(SPECIES[self.columns['species'][row]], self.columns['level'][row])
+        monster.exp = self.columns['exp'][row]
+        monster.health = self.columns['health'][row]
+        monster.energy = self.columns['energy'][row]
+        return monster
+
+    def take(self, row):
+        """Remove a row and return it as a Monster for the party."""
+        monster = self.get_monster(row)
+        for values_column in self.columns.values():
+            del values_column[row]
+        return monster
+
+    def remove(self, rows):
+        rows = set(rows)
+        for column, values_column in self.columns.items():
+            self.columns[column] = array(values_column.typecode,
+                                         (value for row, value in enumerate(values_column) if row not in rows))
+
+    def heal(self):
+        for row, (species, level) in enumerate(zip(self.columns['species'], self.columns['level'])):
+            stats = get_level_stats(SPECIES[species], level)[0]
+            self.columns['health'][row] = stats['max_health']
+            self.columns['energy'][row] = stats['max_energy']
+
+    # sorting and filtering
+    def sort(self, key='level', reverse=False):
+        """Reorder the rows by a column, 'name' sorts by species name and 'element' by element."""
+        if key == 'name':
+            sort_values = [SPECIES[species] for species in self.columns['species']]
+        elif key == 'element':
+            sort_values = [game_data.monster_data[SPECIES[species]]['stats']['element']
+                           for species in self.columns['species']]
+        else:
+            sort_values = self.columns[key]
+        order = sorted(range(len(self)), key=sort_values.__getitem__, reverse=reverse)
+        for column, values_column in self.columns.items():
+            self.columns[column] = array(values_column.typecode, (values_column[row] for row in order))
+
+    def filter(self, name=None, element=None, min_level=1, max_level=100):
+        """Rows of the monsters that match all of the given conditions."""
+        species_ids = {SPECIES_IDS[species] for species in SPECIES
+                       if (name is None or species == name) and
+                       (element is None or game_data.monster_data[species]['stats']['element'] == element)}
+        return [row for row, (species, level) in enumerate(zip(self.columns['species'], self.columns['level']))
+                if species in species_ids and min_level <= level <= max_level]
+
+    # save/load
+    def to_dict(self):
+        # species by name, so saves survive new monsters in game_data
+        data = {column: values_column.tolist() for column, values_column in self.columns.items()}
+        data['species'] = [SPECIES[species] for species in data['species']]
+        return data
+
+    def from_dict(self, data):
+        species = [SPECIES_IDS[name] for name in data['species']]
+        self.columns = {column: array(typecode, species if column == 'species' else data[column])
+                        for column, typecode in COLUMNS.items()}
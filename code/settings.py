@@ -3,9 +3,30 @@ from pygame.math import Vector2 as vector
 from sys import exit
 
 VERSION = '0.6'
+ASSET_CACHE_VERSION = 2
+DEFAULT_WINDOW_SIZE = (1280, 720)
 TILE_SIZE = 64
 ANIMATION_SPEED = 6
 BATTLE_OUTLINE_WIDTH = 4
+TERRAIN_CHUNK_SIZE = 8
+SPATIAL_HASH_CELL_SIZE = TILE_SIZE * 4
+LOS_CELL_SIZE = TILE_SIZE // 4
+IMAGE_LOADER_THREADS = 4
+ATLAS_SIZE = 2048
+MAP_FORMAT_VERSION = 2
+MAP_REGISTRY_SIZE = 3
+TRANSITION_PREFETCH_DISTANCE = TILE_SIZE * 4
+WORLD_CACHE_SIZE = 3
+MAX_SIMULATION_STEPS = 8
+BATTLE_MAX_ROUNDS = 100
+BALANCE_CHUNK_SIZE = 100
+AI_TIME_BUDGET_MS = 5
+AI_EXPLORATION = 1.4
+AI_DEFAULT_DIFFICULTY = 'normal'
+PARTY_SIZE = 6
+PROFILER_KEY = pygame.K_F3
+PROFILER_HISTORY = 120
+PROFILER_BUDGET_MS = 1000 / 60
 
 COLORS = {
     'white': '#f4fefa',
@@ -25,6 +46,13 @@ COLORS = {
     'plant': '#4caf50',
 }
 
+# opponent search per trainer difficulty, playouts per turn (within AI_TIME_BUDGET_MS) and rounds looked ahead
+AI_DIFFICULTY = {
+    'easy': {'iterations': 0, 'depth': 0},
+    'normal': {'iterations': 64, 'depth': 1},
+    'hard': {'iterations': 512, 'depth': 3},
+}
+
 WORLD_LAYERS = {
     'water': 0,
     'bg': 1,
@@ -1,7 +1,6 @@
 import pygame.sprite
 
 from settings import *
-from config_manager import config_manager
 from random import uniform
 from support import draw_bar
 from timer import Timer
@@ -64,14 +63,56 @@ class AnimatedSprite(Sprite):
         self.animate(dt)
 
 
+class AnimationClock:
+    def __init__(self, speed=ANIMATION_SPEED):
+        self.speed = speed
+        # frame lists are keyed by id, every sprite sharing a list shares its frame index
+        self.frames = {}
+        self.frame_indexes = {}
+
+    def subscribe(self, frames):
+        if id(frames) not in self.frames:
+            self.frames[id(frames)] = frames
+            self.frame_indexes[id(frames)] = 0
+
+    def get_frame(self, frames):
+        return frames[int(self.frame_indexes[id(frames)])]
+
+    def update(self, dt):
+        for key, frame_index in self.frame_indexes.items():
+            frame_index += self.speed * dt
+            self.frame_indexes[key] = frame_index if frame_index < len(self.frames[key]) else 0
+
+    def clear(self):
+        self.frames.clear()
+        self.frame_indexes.clear()
+
+
+class SharedAnimatedSprite(pygame.sprite.Sprite):
+    def __init__(self, pos, frames, clock, groups, z=WORLD_LAYERS['main']):
+        super().__init__(groups)
+        self.frames, self.clock = frames, clock
+        self.clock.subscribe(self.frames)
+        self.rect = self.frames[0].get_frect(topleft=pos)
+        self.z = z
+        self.y_sort = self.rect.centery
+        self.hitbox = self.rect.copy()
+
+    @property
+    def image(self):
+        # only looked up when the sprite is drawn, so off-screen tiles cost nothing
+        return self.clock.get_frame(self.frames)
+
+
 # battle sprites
 class MonsterSprite(pygame.sprite.Sprite):
-    def __init__(self, pos, frames, groups, monster, index, pos_index, entity, apply_attack, create_monster):
+    def __init__(self, pos, frames, groups, combatant, apply_attack):
         # data
-        self.index = index
-        self.pos_index = pos_index
-        self.entity = entity
-        self.monster = monster
+        self.combatant = combatant
+        self.index = combatant.index
+        self.pos_index = combatant.pos_index
+        self.entity = combatant.side
+        self.monster = combatant.monster
         self.frame_index, self.frames, self.state = 0, frames, 'idle'
         self.animation_speed = ANIMATION_SPEED + uniform(-1, 1)
         self.z = BATTLE_LAYERS['monster']
@@ -79,20 +120,9 @@ class MonsterSprite(pygame.sprite.Sprite):
         self.target_sprite = None
         self.current_attack = None
         self.apply_attack = apply_attack
-        self.next_monster_data = None
-        self.create_monster = create_monster
-        self.alive = True
 
         # sprite setup
         super().__init__(groups)
-        for state, surface_list in self.frames.items():
-            new_surf_list = []
-            width = config_manager.settings['video']['window_width'] // 10
-            height = width
-            for surf in surface_list:
-                scaled_surf = pygame.transform.scale(surf, (width, height))
-                new_surf_list.append(scaled_surf)
-            self.frames[state] = new_surf_list
         self.image = self.frames[self.state][self.frame_index]
         self.rect = self.image.get_frect(center=pos)
 
@@ -116,16 +146,6 @@ class MonsterSprite(pygame.sprite.Sprite):
         self.frame_index = 0
         self.target_sprite = target_sprite
         self.current_attack = attack
-        self.monster.reduce_energy(attack)
-
-    def instant_kill(self, new_monster):
-        self.next_monster_data = new_monster
-        self.destroy()
-
-    def destroy(self):
-        if self.next_monster_data:
-            self.create_monster(*self.next_monster_data)
-        self.kill()
 
     def __repr__(self):
         return f"{self.monster.name} at lvl: {self.monster.level}"
@@ -141,15 +161,6 @@ class MonsterOutlineSprite(pygame.sprite.Sprite):
         self.z = BATTLE_LAYERS['outline']
         self.monster_sprite = monster_sprite
         self.frames = frames
-        for state, surface_list in self.frames.items():
-            new_surf_list = []
-            width = config_manager.settings['video']['window_width'] // 10
-            height = width
-            for surf in surface_list:
-                scaled_surf = pygame.transform.scale(surf, (width, height))
-                new_surf_list.append(scaled_surf)
-            self.frames[state] = new_surf_list
-
         self.image = self.frames[self.monster_sprite.state][self.monster_sprite.frame_index]
         self.rect = self.image.get_frect(center=self.monster_sprite.rect.center)
 
@@ -4,10 +4,25 @@ from settings import *
 from config_manager import config_manager
 from os.path import join
 from os import walk
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 from pytmx.util_pygame import load_pygame
 
 
 # import functions
+image_loader_threads = IMAGE_LOADER_THREADS
+
+
+def load_images(full_paths, alpha=True):
+    # files are read and decoded on worker threads, converting needs the display so it stays on this thread
+    if image_loader_threads > 1 and len(full_paths) > 1:
+        with ThreadPoolExecutor(min(image_loader_threads, len(full_paths))) as executor:
+            surfs = list(executor.map(pygame.image.load, full_paths))
+    else:
+        surfs = [pygame.image.load(full_path) for full_path in full_paths]
+    return [surf.convert_alpha() if alpha else surf.convert() for surf in surfs]
+
+
 def import_image(*path, alpha=True, file_format='png'):
     full_path = join(*path) + f'.{file_format}'
     surf = pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
@@ -15,23 +30,20 @@ def import_image(*path, alpha=True, file_format='png'):
 
 
 def import_folder(*path):
-    frames = []
+    full_paths = []
     for folder_path, sub_folders, image_names in walk(join(*path)):
         for image_name in sorted(image_names, key=lambda name: int(name.split('.')[0])):
-            full_path = join(folder_path, image_name)
-            surf = pygame.image.load(full_path).convert_alpha()
-            frames.append(surf)
-    return frames
+            full_paths.append(join(folder_path, image_name))
+    return load_images(full_paths)
 
 
 def import_folder_dict(*path):
-    frames = {}
+    names, full_paths = [], []
     for folder_path, sub_folders, image_names in walk(join(*path)):
         for image_name in image_names:
-            full_path = join(folder_path, image_name)
-            surf = pygame.image.load(full_path).convert_alpha()
-            frames[image_name.split('.')[0]] = surf
-    return frames
+            names.append(image_name.split('.')[0])
+            full_paths.append(join(folder_path, image_name))
+    return dict(zip(names, load_images(full_paths)))
 
 
 def import_sub_folders(*path):
@@ -44,8 +56,11 @@ def import_sub_folders(*path):
 
 
 def import_tilemap(cols, rows, *path):
+    return cut_tilemap(import_image(*path), cols, rows)
+
+
+def cut_tilemap(surf, cols, rows):
     frames = {}
-    surf = import_image(*path)
     cell_width, cell_height = surf.get_width() / cols, surf.get_height() / rows
     for col in range(cols):
         for row in range(rows):
@@ -59,7 +74,10 @@ def import_tilemap(cols, rows, *path):
 
 
 def import_single_character(cols, rows, *path):
-    frame_dict = import_tilemap(cols, rows, *path)
+    return character_frames(import_tilemap(cols, rows, *path), cols)
+
+
+def character_frames(frame_dict, cols):
     new_dict = {}
     for row, direction in enumerate(('down', 'left', 'right', 'up')):
         new_dict[direction] = [frame_dict[(col, row)] for col in range(cols)]
@@ -69,10 +87,8 @@ def import_single_character(cols, rows, *path):
 
 def import_all_characters(*path):
     new_dict = {}
-    for _, __, image_names in walk(join(*path)):
-        for image in image_names:
-            image_name = image.split('.')[0]
-            new_dict[image_name] = import_single_character(4, 4, *path, image_name)
+    for image_name, surf in import_folder_dict(*path).items():
+        new_dict[image_name] = character_frames(cut_tilemap(surf, 4, 4), 4)
     return new_dict
 
 
@@ -102,22 +118,18 @@ def import_tmx_maps(*path):
 
 def import_monster(cols, rows, *path):
     monster_dict = {}
-    for folder_path, sub_folders, image_names in walk(join(*path)):
-        for image in image_names:
-            image_name = image.split('.')[0]
-            monster_dict[image_name] = {}
-            frame_dict = import_tilemap(cols, rows, *path, image_name)
-            for row, key in enumerate(('idle', 'attack')):
-                monster_dict[image_name][key] = [frame_dict[(col, row)] for col in range(cols)]
+    for image_name, surf in import_folder_dict(*path).items():
+        monster_dict[image_name] = {}
+        frame_dict = cut_tilemap(surf, cols, rows)
+        for row, key in enumerate(('idle', 'attack')):
+            monster_dict[image_name][key] = [frame_dict[(col, row)] for col in range(cols)]
     return monster_dict
 
 
 def import_attacks(*path):
     attack_dict = {}
-    for folder_path, _, image_names in walk(join(*path)):
-        for image in image_names:
-            image_name = image.split('.')[0]
-            attack_dict[image_name] = list(import_tilemap(4, 1, folder_path, image_name).values())
+    for image_name, surf in import_folder_dict(*path).items():
+        attack_dict[image_name] = list(cut_tilemap(surf, 4, 1).values())
     return attack_dict
 
 
@@ -151,25 +163,22 @@ def draw_bar(surf, rect, value, max_value, color, bg_color, radius=1):
 
 
 def outline_creator(frame_dict, width):
+    # the eight neighbouring offsets around the frame, the centre stays empty like the blitted version had it
+    offsets = [(x * width, y * width) for x, y in product(range(3), repeat=2) if (x, y) != (1, 1)]
     outline_frame_dict = {}
     for monster, monster_frames in frame_dict.items():
         outline_frame_dict[monster] = {}
         for state, frames in monster_frames.items():
             outline_frame_dict[monster][state] = []
             for frame in frames:
-                new_surf = pygame.Surface(vector(frame.get_size()) + vector(width * 2), pygame.SRCALPHA)
-                new_surf.fill((0, 0, 0, 0))
-                white_frame = pygame.mask.from_surface(frame).to_surface()
-                white_frame.set_colorkey('black')
-
-                new_surf.blit(white_frame, (0, 0))  # topleft
-                new_surf.blit(white_frame, (width, 0))  # top
-                new_surf.blit(white_frame, (width*2, 0))  # topright
-                new_surf.blit(white_frame, (width*2, width))  # right
-                new_surf.blit(white_frame, (width*2, width*2))  # bottomright
-                new_surf.blit(white_frame, (width, width*2))  # bottom
-                new_surf.blit(white_frame, (0, width*2))  # bottomleft
-                new_surf.blit(white_frame, (0, width))  # left
+                size = vector(frame.get_size()) + vector(width * 2)
+                # or the frame mask into one bigger mask at every offset and turn that into the surface once
+                frame_mask = pygame.mask.from_surface(frame)
+                outline_mask = pygame.mask.Mask(size)
+                for offset in offsets:
+                    outline_mask.draw(frame_mask, offset)
+                new_surf = pygame.Surface(size, pygame.SRCALPHA)
+                outline_mask.to_surface(new_surf, unsetcolor=None)
                 outline_frame_dict[monster][state].append(new_surf)
     return outline_frame_dict
 
@@ -0,0 +1,83 @@
+import os
+import unittest
+from os.path import join
+
+# headless, run from inside code/ like the game: python -m unittest discover tests
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+from settings import *
+from config_manager import config_manager
+from occupancy_grid import OccupancyGrid
+
+MAPS = join('..', 'data', 'maps')
+# player positions are sampled every this many pixels around each character
+SAMPLE_STEP = 13
+
+
+def clipline_los(rects, start, end):
+    # the line of sight test before the grid, the line clipped against every collision rect of the map
+    return not any(rect.clipline(start, end) for rect in rects)
+
+
+class LineOfSightTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.init()
+        config_manager.settings['video']['window_width'], config_manager.settings['video']['window_height'] = \
+            DEFAULT_WINDOW_SIZE
+        pygame.display.set_mode(DEFAULT_WINDOW_SIZE)
+
+    def test_grid_matches_clipline_on_shipped_maps(self):
+        from map_compiler import map_compiler
+        mismatches = []
+        for file in sorted(os.listdir(MAPS)):
+            tmx_map = map_compiler.load(join(MAPS, file))
+            # the same rects Game.setup blocks
+            rects = [pygame.FRect(obj.x, obj.y, obj.width, obj.height)
+                     for obj in tmx_map.get_layer_by_name('Collisions')]
+            rects += [obj.image.get_frect(topleft=(obj.x, obj.y))
+                      for obj in tmx_map.get_layer_by_name('Objects') if obj.name != 'top']
+            grid = OccupancyGrid(tmx_map.width * TILE_SIZE, tmx_map.height * TILE_SIZE)
+            for rect in rects:
+                grid.block(rect)
+
+            for obj in tmx_map.get_layer_by_name('Entities'):
+                if obj.name == 'Player':
+                    continue
+                start, radius = pygame.Vector2(obj.x, obj.y), int(obj.properties['radius'])
+                for x in range(-radius, radius, SAMPLE_STEP):
+                    for y in range(-radius, radius, SAMPLE_STEP):
+                        end = start + (x + 0.5, y)
+                        if start.distance_to(end) < radius and \
+                                grid.has_los(start, end) != clipline_los(rects, start, end):
+                            mismatches.append((file, tuple(start), tuple(end)))
+        self.assertEqual(mismatches, [])
+
+    def test_characters_block_line_of_sight(self):
+        from game import Game
+        game = Game(lambda *args: None)
+        characters = list(game.character_sprites)
+        self.assertGreater(len(characters), 1)
+        watcher, other = characters[:2]
+
+        # a spot in range the walls don't hide, then another character steps in between
+        center = pygame.Vector2(watcher.rect.center)
+        for direction in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            end = center + pygame.Vector2(direction) * watcher.radius / 2
+            if game.occupancy_grid.has_los(center, end):
+                break
+        else:
+            self.skipTest('no clear line around the first character')
+        game.player.rect.center = end
+        other.rect.center = (1 << 20, 1 << 20)
+        self.assertTrue(watcher.has_los())
+
+        other.rect.center = center.lerp(end, 0.5)
+        self.assertFalse(watcher.has_los())
+
+
+if __name__ == '__main__':
+    unittest.main()
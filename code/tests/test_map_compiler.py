@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from os.path import join
+
+from map_compiler import MapCompiler
+
+ARENA = join('..', 'data', 'maps', 'arena.tmx')
+
+
+class MapStalenessTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.compiler = MapCompiler(self.cache.name + os.sep)
+        self.data = self.compiler.get_data(ARENA)
+        self.sources = [source for *_, source in self.compiler.unpack_sources(self.data)[0]]
+
+    def tearDown(self):
+        self.cache.cleanup()
+
+    def test_sources_cover_tilesets_and_images(self):
+        self.assertTrue(any(source.endswith('.tsx') for source in self.sources))
+        self.assertTrue(any(source.endswith('.png') for source in self.sources))
+
+    def test_fresh_map_is_not_stale(self):
+        self.assertFalse(self.compiler.is_stale(self.data, os.stat(ARENA)))
+
+    def test_edited_tileset_makes_the_map_stale(self):
+        tileset = next(source for source in self.sources if source.endswith('.tsx'))
+        stat = os.stat(tileset)
+        # a later mtime is all an editor save changes for the check, put the original back afterwards
+        os.utime(tileset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        try:
+            self.assertTrue(self.compiler.is_stale(self.data, os.stat(ARENA)))
+            recompiled = self.compiler.get_data(ARENA)
+            self.assertFalse(self.compiler.is_stale(recompiled, os.stat(ARENA)))
+        finally:
+            os.utime(tileset, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertFalse(self.compiler.is_stale(self.data, os.stat(ARENA)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import unittest
+
+# headless, run from inside code/ like the game: python -m unittest discover tests
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+from settings import *
+from config_manager import config_manager
+from monster import Monster
+
+
+class StorageEvolutionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.init()
+        config_manager.settings['video']['window_width'], config_manager.settings['video']['window_height'] = \
+            DEFAULT_WINDOW_SIZE
+        pygame.display.set_mode(DEFAULT_WINDOW_SIZE)
+        from game import Game
+        cls.Game = Game
+
+    def setUp(self):
+        self.game = self.Game(lambda *args: None)
+        while len(self.game.player_monsters) < PARTY_SIZE:
+            self.game.player_monsters[len(self.game.player_monsters)] = Monster('Jacana', 10)
+
+    def test_monster_past_the_party_evolves_in_storage(self):
+        # caught with a full party, then levelled into its evolution in the same battle
+        caught = Monster('Larvea', 11)
+        caught.update_exp(caught.level_up - caught.exp)
+        self.assertEqual(caught.level, 12)
+        self.game.player_monsters[PARTY_SIZE] = caught
+
+        self.game.check_evolution()
+        while self.game.evolution:
+            self.game.end_evolution()
+
+        self.assertEqual(len(self.game.player_monsters), PARTY_SIZE)
+        self.assertEqual(sorted(self.game.player_monsters), list(range(PARTY_SIZE)))
+        self.assertEqual([(record.name, record.level) for record in self.game.monster_storage], [('Cleaf', 12)])
+        self.assertNotIn('Larvea', [monster.name for monster in self.game.player_monsters.values()])
+
+    def test_party_evolution_stays_in_the_party(self):
+        self.game.player_monsters[0] = Monster('Sparchu', 15)
+        self.game.player_monsters[PARTY_SIZE] = Monster('Jacana', 5)
+
+        self.game.check_evolution()
+        while self.game.evolution:
+            self.game.end_evolution()
+
+        self.assertEqual(self.game.player_monsters[0].name, 'Cindrill')
+        self.assertEqual(len(self.game.player_monsters), PARTY_SIZE)
+        self.assertEqual([record.name for record in self.game.monster_storage], ['Jacana'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,16 @@
+from settings import *
+from groups import AllSprites, SpatialGroup, CollisionSprites
+
+
+class World:
+    """The sprite groups setup builds for one map, kept around so a return visit can resume them."""
+    def __init__(self):
+        self.collision_sprites = CollisionSprites()
+        self.all_sprites = AllSprites(self.collision_sprites)
+        self.character_sprites = pygame.sprite.Group()
+        self.transition_sprites = SpatialGroup()
+        self.encounter_sprites = SpatialGroup()
+        self.occupancy_grid = None
+
+        # player spawn points of the map by their pos property
+        self.player_starts = {}